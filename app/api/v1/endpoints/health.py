@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.model_registry import model_registry
+
+router = APIRouter()
+
+
+@router.get("/health/live")
+async def liveness():
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    models = {
+        handle.name: {"status": handle.status, "error": handle.error}
+        for handle in model_registry.handles.values()
+    }
+    if model_registry.ready:
+        return {"status": "ready", "models": models}
+
+    failed = any(model["status"] == "failed" for model in models.values())
+    return JSONResponse(
+        status_code=503,
+        content={"status": "failed" if failed else "starting", "models": models})
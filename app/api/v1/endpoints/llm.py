@@ -1,19 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException
 from app.schemas.llm import SmartHomeRequest, SmartHomeResponse
-from app.services.llm_service import LLMService
+from app.core.model_registry import model_registry, ModelHandle
+from app.core.inference_executor import inference_executor
 from app.services.mqtt_service import mqtt_service
+from app.services.intent_service import intent_service
+from app.services.llm_service import record_turn
+from app.services.response_cache import response_cache
 
 router = APIRouter()
 
 
 def get_llm_service():
-    return LLMService()
+    return model_registry.handle("llm")
 
 
 @router.post("/smart-home", response_model=SmartHomeResponse)
 async def smart_home(
     request: SmartHomeRequest,
-    service: LLMService = Depends(get_llm_service)
+    llm: ModelHandle = Depends(get_llm_service)
 ):
     sensor_data = mqtt_service.get_latest_data()
 
@@ -30,8 +34,35 @@ async def smart_home(
         "humidity": sensor_data.get("humedad", 20.0),
         "ventilador": sensor_data.get("ventilador", True),
         "persianas": sensor_data.get("persianas", True),
-        "bulbs": sensor_data.get("bulbs", True)
+        "bulbs": sensor_data.get("bulbs", True),
+        "session_id": request.session_id
     }
 
-    result = service.generate_smart_home_response(context)
+    result = intent_service.match(context) or response_cache.get(context)
+    if result is None:
+        result = await inference_executor.run(
+            "llm", llm.call, "generate_smart_home_response", context)
+        response_cache.put(context, result)
+    else:
+        await record_turn(context, result)
     return SmartHomeResponse(**result)
+
+
+@router.get("/smart-home/intents")
+async def intent_stats(llm: ModelHandle = Depends(get_llm_service)):
+    llm_seconds = None
+    if llm.loaded:
+        llm_seconds = llm.instance.stats().get("avg_generation_seconds")
+    return intent_service.stats(llm_seconds)
+
+
+@router.get("/smart-home/cache")
+async def response_cache_stats():
+    return response_cache.stats()
+
+
+@router.get("/smart-home/sessions")
+async def session_stats(llm: ModelHandle = Depends(get_llm_service)):
+    if not llm.loaded:
+        return None
+    return llm.instance.stats().get("sessions")
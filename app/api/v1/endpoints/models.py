@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from app.core.model_registry import model_registry
+from app.core.inference_executor import inference_executor
+from app.core.thread_budget import thread_budget
+
+router = APIRouter()
+
+
+@router.get("/models")
+async def list_models():
+    return model_registry.stats()
+
+
+@router.get("/models/queues")
+async def list_queues():
+    return inference_executor.stats()
+
+
+@router.get("/models/threads")
+async def thread_budget_stats():
+    return thread_budget.stats()
@@ -1,11 +1,26 @@
-from fastapi import APIRouter, UploadFile, File, Depends, BackgroundTasks, Body
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, Depends, Body, Header, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from app.services.pipeline_service import PipelineService
-from pathlib import Path
-from pydantic import BaseModel
+from app.services.live_session import LiveSession
+from app.services.audio_store import audio_store, StoredAudio
+from app.core.metrics import span
+from app.core.audio import (
+    LIVE_RATES, SAMPLE_RATE, UnsupportedAudioFormat, encode_audio, negotiate_encoding, read_wav,
+    tee_chunks)
+from app.core.config import settings
+from app.core.inference_executor import InferenceQueueFull
+from app.core.model_registry import model_registry, ModelNotReady
+from app.services.whisper_service import NoSpeechDetected
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional
+import asyncio
+import json
+import re
 
 router = APIRouter()
 
+RANGE_HEADER = re.compile(r"bytes=(\d*)-(\d*)$")
+
 
 class DeviceContext(BaseModel):
     temperature: float
@@ -14,14 +29,37 @@ class DeviceContext(BaseModel):
     ventilador: bool
     persianas: bool
     bulbs: bool
+    session_id: Optional[str] = None
+
+
+class LiveStreamStart(DeviceContext):
+    encoding: str = "pcm16"
+    sample_rate: int = Field(SAMPLE_RATE, ge=LIVE_RATES[0], le=LIVE_RATES[1])
 
 
 def get_pipeline_service():
+    model_registry.require("whisper", "tts")
     return PipelineService()
 
 
-def cleanup_file(file_path: str):
-    Path(file_path).unlink(missing_ok=True)
+def parse_range(header: str, size: int) -> Optional[tuple]:
+    match = RANGE_HEADER.match(header.strip())
+    if match is None or size == 0:
+        return None
+
+    first, last = match.groups()
+    if first == "":
+        if last == "":
+            return None
+        start = max(size - int(last), 0)
+        end = size
+    else:
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+
+    if start >= size or start >= end:
+        return None
+    return start, end
 
 
 @router.post("/pipeline")
@@ -33,6 +71,7 @@ async def audio_pipeline(
     ventilador: bool = Body(...),
     persianas: bool = Body(...),
     bulbs: bool = Body(...),
+    session_id: Optional[str] = Body(None),
     service: PipelineService = Depends(get_pipeline_service)
 ):
     context = {
@@ -41,32 +80,172 @@ async def audio_pipeline(
         "humidity": humidity,
         "ventilador": ventilador,
         "persianas": persianas,
-        "bulbs": bulbs
+        "bulbs": bulbs,
+        "session_id": session_id
     }
 
     result = await service.process_audio(file, context)
 
     return {
         "transcription": result['transcription'],
+        "transcription_tier": result['transcription_tier'],
         "answer": result['answer'],
-        "audio_filename": Path(result['audio_file']).name,
+        "audio_filename": result['audio_id'],
         "ventilador": result['ventilador'],
         "persianas": result['persianas'],
         "bulbs": result['bulbs']
     }
 
 
-@router.get("/audio/{filename}")
-async def get_audio(filename: str, background_tasks: BackgroundTasks):
-    file_path = Path("temp_audio") / filename
+async def send_events(websocket: WebSocket, open_stream):
+    await websocket.accept()
+
+    try:
+        async for event in await open_stream():
+            if isinstance(event, bytes):
+                await websocket.send_bytes(event)
+            else:
+                await websocket.send_json(event)
+
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except NoSpeechDetected as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1000)
+    except UnsupportedAudioFormat as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1003)
+    except ValidationError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1007)
+    except InferenceQueueFull as e:
+        await websocket.send_json({
+            "type": "error",
+            "detail": f"Servidor ocupado ({e.pool}), intente de nuevo más tarde.",
+            "retry_after": e.retry_after
+        })
+        await websocket.close(code=1013)
+    except ModelNotReady as e:
+        await websocket.send_json({
+            "type": "error",
+            "detail": f"El modelo '{e.name}' aún se está cargando ({e.status}).",
+            "retry_after": e.retry_after
+        })
+        await websocket.close(code=1013)
+
+
+@router.websocket("/pipeline/stream")
+async def audio_pipeline_stream(websocket: WebSocket):
+    async def open_stream():
+        service = get_pipeline_service()
+        context = DeviceContext(**await websocket.receive_json()).model_dump()
+        data = await websocket.receive_bytes()
+        return service.stream_audio(data, "stream.wav", context)
+
+    await send_events(websocket, open_stream)
+
+
+async def live_frames(websocket: WebSocket):
+    while True:
+        try:
+            message = await asyncio.wait_for(websocket.receive(), settings.LIVE_FRAME_TIMEOUT)
+        except asyncio.TimeoutError:
+            return
+
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        if message.get("bytes") is not None:
+            yield message["bytes"]
+            continue
+        try:
+            control = json.loads(message.get("text") or "{}")
+        except ValueError:
+            continue
+        if isinstance(control, dict) and control.get("type") == "end":
+            return
+
+
+@router.websocket("/pipeline/live")
+async def audio_pipeline_live(websocket: WebSocket):
+    async def open_stream():
+        service = get_pipeline_service()
+        start = LiveStreamStart(**await websocket.receive_json())
+        session = LiveSession(
+            start.model_dump(include=set(DeviceContext.model_fields)),
+            start.encoding, start.sample_rate)
+        return service.stream_live(live_frames(websocket), session)
+
+    await send_events(websocket, open_stream)
+
+
+@router.get("/audio-store/stats")
+async def audio_store_stats():
+    return audio_store.stats()
+
+
+def serve_entry(entry, request: Request, filename: str) -> Response:
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    }
+
+    range_header = request.headers.get("range")
+    if range_header is None:
+        return Response(entry.read(), media_type=entry.media_type, headers=headers)
+
+    byte_range = parse_range(range_header, entry.size)
+    if byte_range is None:
+        return Response(
+            status_code=416, headers={"Content-Range": f"bytes */{entry.size}"})
 
-    if not file_path.exists():
-        return {"error": "File not found"}
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end - 1}/{entry.size}"
+    return Response(
+        entry.read(start, end), status_code=206,
+        media_type=entry.media_type, headers=headers)
 
-    background_tasks.add_task(cleanup_file, str(file_path))
 
-    return FileResponse(
-        file_path,
-        media_type="audio/wav",
-        filename="output.wav"
-    )
+@router.get("/audio/{filename}")
+async def get_audio(
+    filename: str,
+    request: Request,
+    format: Optional[str] = None,
+    sample_rate: Optional[int] = None,
+    bits: Optional[int] = None,
+    accept: Optional[str] = Header(None)
+):
+    with span("audio_serve"):
+        entry = audio_store.get(filename)
+
+        if entry is None:
+            return JSONResponse(status_code=404, content={"error": "File not found"})
+
+        encoding = negotiate_encoding(format, sample_rate, bits, accept)
+        if encoding.is_passthrough():
+            return serve_entry(entry, request, "output.wav")
+
+        pcm, source_rate = read_wav(entry.read())
+        if encoding.is_passthrough(source_rate):
+            return serve_entry(entry, request, "output.wav")
+
+        output_name = f"output{encoding.suffix}"
+        variant_id = f"{filename}:{encoding.variant}"
+        variant = audio_store.get(variant_id)
+        if variant is not None:
+            return serve_entry(variant, request, output_name)
+
+        def store(data: bytes):
+            audio_store.put(data, encoding.media_type, audio_id=variant_id)
+
+        if request.headers.get("range") is not None:
+            data = await asyncio.to_thread(
+                lambda: b"".join(encode_audio(pcm, source_rate, encoding)))
+            await asyncio.to_thread(store, data)
+            variant = StoredAudio(variant_id, data, None, len(data), encoding.media_type, 0)
+            return serve_entry(variant, request, output_name)
+
+        return StreamingResponse(
+            tee_chunks(encode_audio(pcm, source_rate, encoding), store),
+            media_type=encoding.media_type,
+            headers={"Content-Disposition": f'attachment; filename="{output_name}"'})
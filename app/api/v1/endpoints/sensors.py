@@ -1,7 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 from fastapi.responses import StreamingResponse
 from app.services.mqtt_service import mqtt_service
-from app.schemas.sensors import SensorData
+from app.services.sensor_hub import sensor_hub
+from app.services.sensor_history import sensor_history
+from app.core.config import settings
+from app.schemas.sensors import SensorData, SensorHistoryResponse
 import json
 import asyncio
 
@@ -12,27 +15,23 @@ router = APIRouter()
 @router.get("/sensors/stream")
 async def stream_sensor_data():
     async def event_generator():
-        print("🔴 New SSE client connected")
+        subscription = sensor_hub.subscribe()
+        print(f"🔴 New SSE client connected ({len(sensor_hub.subscribers)} total)")
         try:
             while True:
-                data = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    mqtt_service.get_data_blocking,
-                    30
-                )
+                data = await subscription.get(settings.SENSOR_STREAM_KEEPALIVE)
 
                 if data is None:
                     yield f"data: {json.dumps({'status': 'keepalive'})}\n\n"
-                    print("💤 Keepalive sent")
                 else:
-                    json_data = json.dumps(data)
-                    yield f"data: {json_data}\n\n"
-                    print(f"📤 Data sent to client: {json_data}")
+                    yield f"data: {json.dumps(data)}\n\n"
 
         except asyncio.CancelledError:
             print("🔵 SSE client disconnected")
         except Exception as e:
             print(f"❌ Stream error: {e}")
+        finally:
+            sensor_hub.unsubscribe(subscription)
 
     return StreamingResponse(
         event_generator(),
@@ -58,3 +57,16 @@ async def get_latest_sensor_data():
             bulbs=False
         )
     return SensorData(**data)
+
+
+@router.get("/sensors/stream/stats")
+async def get_stream_stats():
+    return sensor_hub.stats()
+
+
+@router.get("/sensors/history", response_model=SensorHistoryResponse)
+async def get_sensor_history(
+    seconds: float = Query(3600, gt=0, le=7 * 86400),
+    points: int = Query(60, gt=0, le=1000)
+):
+    return sensor_history.query(seconds, points)
@@ -1,18 +1,22 @@
-from fastapi import APIRouter, UploadFile, File, Depends
+from fastapi import APIRouter, UploadFile, File
 from app.schemas.transcription import TranscriptionResponse
-from app.services.whisper_service import WhisperService
+from app.core.model_registry import model_registry
+from app.services.whisper_service import transcribe, vad_stats
 
 router = APIRouter()
 
 
-def get_whisper_service():
-    return WhisperService()
+@router.post("/transcribe", response_model=TranscriptionResponse)
+async def transcribe_audio(file: UploadFile = File(...)):
+    data = await file.read()
+    transcription = await transcribe(data, file.filename)
+    return TranscriptionResponse(**transcription)
 
 
-@router.post("/transcribe", response_model=TranscriptionResponse)
-async def transcribe_audio(
-    file: UploadFile = File(...),
-    service: WhisperService = Depends(get_whisper_service)
-):
-    text = await service.transcribe_audio(file)
-    return TranscriptionResponse(text=text)
+@router.get("/transcribe/stats")
+async def transcribe_stats():
+    whisper = model_registry.handle("whisper")
+    return {
+        "vad": vad_stats.stats(),
+        "stt": whisper.instance.stats() if whisper.loaded else None
+    }
@@ -1,34 +1,37 @@
-from fastapi import APIRouter, Depends, BackgroundTasks
-from fastapi.responses import FileResponse
+from typing import Optional
+from fastapi import APIRouter, Header
+from fastapi.responses import Response, StreamingResponse
 from app.schemas.tts import TTSRequest
-from app.services.tts_service import TTSService
-from pathlib import Path
-import uuid
+from app.core.audio import encode_audio, negotiate_encoding, tee_chunks
+from app.core.model_registry import model_registry
+from app.services.tts_service import synthesize_pcm, synthesize_wav, tts_cache
+import asyncio
 
 router = APIRouter()
 
 
-def get_tts_service():
-    return TTSService()
-
-
-def cleanup_file(file_path: str):
-    Path(file_path).unlink(missing_ok=True)
-
-
 @router.post("/tts")
-async def text_to_speech(
-    request: TTSRequest,
-    background_tasks: BackgroundTasks,
-    service: TTSService = Depends(get_tts_service)
-):
-    output_file = Path("temp_audio") / f"{uuid.uuid4()}.wav"
-    service.text_to_speech(request.text, str(output_file))
-
-    background_tasks.add_task(cleanup_file, str(output_file))
-
-    return FileResponse(
-        output_file,
-        media_type="audio/wav",
-        filename="speech.wav"
-    )
+async def text_to_speech(request: TTSRequest, accept: Optional[str] = Header(None)):
+    encoding = negotiate_encoding(request.format, request.sample_rate, request.bits, accept)
+    headers = {"Content-Disposition": f'attachment; filename="speech{encoding.suffix}"'}
+    tts = model_registry.get("tts")
+
+    if encoding.is_passthrough(tts.sample_rate):
+        wav = await synthesize_wav(request.text)
+        return Response(content=wav, media_type=encoding.media_type, headers=headers)
+
+    key = tts.cache_key(request.text, encoding.params)
+    encoded = await asyncio.to_thread(tts_cache.get, key)
+    if encoded is not None:
+        return Response(content=encoded, media_type=encoding.media_type, headers=headers)
+
+    pcm = await synthesize_pcm(request.text)
+    chunks = tee_chunks(
+        encode_audio(pcm, tts.sample_rate, encoding),
+        lambda data: tts_cache.put(key, data, request.text))
+    return StreamingResponse(chunks, media_type=encoding.media_type, headers=headers)
+
+
+@router.get("/tts/cache")
+async def tts_cache_stats():
+    return tts_cache.stats()
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import transcribe, tts, pipeline, llm, sensors
+from app.api.v1.endpoints import transcribe, tts, pipeline, llm, sensors, models
 
 api_router = APIRouter()
 api_router.include_router(transcribe.router, tags=["transcription"])
@@ -7,3 +7,4 @@ api_router.include_router(tts.router, tags=["tts"])
 api_router.include_router(pipeline.router, tags=["pipeline"])
 api_router.include_router(llm.router, tags=["llm"])
 api_router.include_router(sensors.router, tags=["sensors"])
+api_router.include_router(models.router, tags=["models"])
@@ -0,0 +1,406 @@
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+import io
+import wave
+import av
+import numpy as np
+from app.core.config import settings
+
+SAMPLE_RATE = 16000
+
+AUDIO_FORMATS = {
+    "wav": ("audio/wav", ".wav"),
+    "opus": ("audio/ogg", ".ogg"),
+    "mp3": ("audio/mpeg", ".mp3"),
+}
+
+ACCEPT_TYPES = {
+    "audio/wav": "wav",
+    "audio/wave": "wav",
+    "audio/x-wav": "wav",
+    "audio/ogg": "opus",
+    "audio/opus": "opus",
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+}
+
+ENCODERS = {
+    "opus": ("ogg", "libopus", (8000, 12000, 16000, 24000, 48000)),
+    "mp3": ("mp3", "libmp3lame",
+            (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000)),
+}
+
+WAV_BITS = (8, 16)
+WAV_RATES = (8000, 48000)
+LIVE_ENCODINGS = ("pcm16", "opus")
+LIVE_RATES = (8000, 48000)
+ENCODE_FRAME_SAMPLES = 4096
+MAX_ADAPTIVE_DB = 25.0
+STREAM_CHUNK_BYTES = 16 * 1024
+
+
+class UnsupportedAudioFormat(ValueError):
+    pass
+
+
+class AudioEncoding:
+    def __init__(self, format: str = "wav", sample_rate: Optional[int] = None,
+                 bits: int = 16, bitrate: Optional[int] = None):
+        self.format = format
+        self.sample_rate = sample_rate
+        self.bits = bits
+        self.bitrate = bitrate
+
+    @property
+    def media_type(self) -> str:
+        return AUDIO_FORMATS[self.format][0]
+
+    @property
+    def suffix(self) -> str:
+        return AUDIO_FORMATS[self.format][1]
+
+    @property
+    def params(self) -> dict:
+        return {
+            "format": self.format,
+            "sample_rate": self.sample_rate,
+            "bits": self.bits,
+            "bitrate": self.bitrate,
+        }
+
+    @property
+    def variant(self) -> str:
+        return "-".join(str(value) for value in self.params.values() if value is not None)
+
+    def is_passthrough(self, sample_rate: Optional[int] = None) -> bool:
+        return (self.format == "wav" and self.bits == 16
+                and self.sample_rate in (None, sample_rate))
+
+
+def decode_audio(data: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+    chunks = []
+
+    try:
+        with av.open(io.BytesIO(data), mode="r") as container:
+            for frame in container.decode(audio=0):
+                frame.pts = None
+                for resampled in resampler.resample(frame):
+                    chunks.append(resampled.to_ndarray().reshape(-1))
+
+            for resampled in resampler.resample(None):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+    except av.error.FFmpegError as e:
+        raise UnsupportedAudioFormat(f"Could not decode audio: {e}") from e
+
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+
+    return to_float32(np.concatenate(chunks))
+
+
+def trim_silence(audio: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                 threshold_db: float = -45.0, margin_db: float = 10.0,
+                 frame_ms: int = 30, padding_ms: int = 200,
+                 min_speech_ms: int = 250) -> np.ndarray:
+    frame = sample_rate * frame_ms // 1000
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return audio[:0]
+
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    level_db = 20 * np.log10(np.maximum(rms, 1e-10))
+
+    # Adapt to the clip's noise floor only when it has a quieter stretch to
+    # measure: in all-speech clips or steady tones the 10th percentile sits
+    # inside the signal, and floor + margin would reject it.
+    noise_floor, loud = np.percentile(level_db, (10, 90))
+    threshold = threshold_db
+    if loud - noise_floor >= margin_db:
+        threshold = max(threshold_db, min(noise_floor + margin_db, threshold_db + MAX_ADAPTIVE_DB))
+    speech = level_db > threshold
+
+    if speech.sum() * frame_ms < min_speech_ms:
+        return audio[:0]
+
+    voiced = np.flatnonzero(speech)
+    padding = padding_ms // frame_ms
+    first = max(voiced[0] - padding, 0) * frame
+    last = min(voiced[-1] + 1 + padding, n_frames) * frame
+    if voiced[-1] + 1 + padding >= n_frames:
+        last = len(audio)
+    return audio[first:last]
+
+
+class StreamDecoder:
+    def __init__(self, encoding: str = "pcm16", sample_rate: int = SAMPLE_RATE):
+        if encoding not in LIVE_ENCODINGS:
+            raise UnsupportedAudioFormat(
+                f"Unsupported stream encoding '{encoding}', expected one of {', '.join(LIVE_ENCODINGS)}")
+        if not LIVE_RATES[0] <= sample_rate <= LIVE_RATES[1]:
+            raise UnsupportedAudioFormat(
+                f"Stream sample rate must be between {LIVE_RATES[0]} and {LIVE_RATES[1]} Hz")
+
+        self.sample_rate = sample_rate
+        self.codec = av.CodecContext.create("opus", "r") if encoding == "opus" else None
+        self.resampler = None
+        if self.codec is not None or sample_rate != SAMPLE_RATE:
+            self.resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+        self.remainder = b""
+
+    def decode(self, data: bytes) -> np.ndarray:
+        if self.codec is not None:
+            try:
+                frames = self.codec.decode(av.Packet(data))
+            except av.error.FFmpegError as e:
+                raise UnsupportedAudioFormat(f"Invalid Opus frame: {e}") from e
+        else:
+            data = self.remainder + data
+            usable = len(data) - len(data) % 2
+            self.remainder = data[usable:]
+            samples = np.frombuffer(data[:usable], dtype="<i2")
+            if self.resampler is None or len(samples) == 0:
+                return to_float32(samples.astype(np.int16))
+            frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="s16", layout="mono")
+            frame.sample_rate = self.sample_rate
+            frames = [frame]
+
+        chunks = []
+        for frame in frames:
+            frame.pts = None
+            for resampled in self.resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        if not chunks:
+            return np.zeros(0, dtype=np.float32)
+        return to_float32(np.concatenate(chunks))
+
+
+class Endpointer:
+    def __init__(self, sample_rate: int = SAMPLE_RATE, threshold_db: float = -45.0,
+                 margin_db: float = 10.0, frame_ms: int = 30, min_speech_ms: int = 250,
+                 end_silence_ms: int = 700):
+        self.frame = sample_rate * frame_ms // 1000
+        self.frame_ms = frame_ms
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.min_speech_ms = min_speech_ms
+        self.end_silence_ms = end_silence_ms
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.position = 0
+        self.noise_floor = None
+        self.speech_ms = 0
+        self.silence_ms = 0
+        self.speech_start = None
+        self.speech_end = None
+        self.ended = False
+
+    @property
+    def started(self) -> bool:
+        return self.speech_ms >= self.min_speech_ms
+
+    def push(self, audio: np.ndarray) -> bool:
+        audio = np.concatenate([self.pending, audio])
+        n_frames = len(audio) // self.frame
+        self.pending = audio[n_frames * self.frame:]
+        if n_frames == 0 or self.ended:
+            return self.ended
+
+        frames = audio[:n_frames * self.frame].reshape(n_frames, self.frame)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        for level_db in 20 * np.log10(np.maximum(rms, 1e-10)):
+            self.push_level(float(level_db))
+            self.position += self.frame
+            if self.ended:
+                break
+        return self.ended
+
+    def push_level(self, level_db: float):
+        if self.noise_floor is None:
+            self.noise_floor = level_db
+        voiced = level_db > max(self.threshold_db, self.noise_floor + self.margin_db)
+
+        if voiced:
+            if self.speech_start is None:
+                self.speech_start = self.position
+            self.speech_end = self.position + self.frame
+            self.speech_ms += self.frame_ms
+            self.silence_ms = 0
+            return
+
+        # Falls immediately to quieter frames, rises slowly with background noise.
+        self.noise_floor = min(level_db, self.noise_floor + 0.05 * (level_db - self.noise_floor))
+        if self.speech_start is None:
+            return
+        self.silence_ms += self.frame_ms
+        if self.silence_ms < self.end_silence_ms:
+            return
+        if self.started:
+            self.ended = True
+        else:
+            self.speech_start = self.speech_end = None
+            self.speech_ms = self.silence_ms = 0
+
+
+def to_float32(audio: np.ndarray) -> np.ndarray:
+    if audio.dtype == np.int16:
+        return audio.astype(np.float32) / 32768.0
+    return audio.astype(np.float32, copy=False)
+
+
+def to_int16(audio: np.ndarray) -> np.ndarray:
+    if audio.dtype == np.int16:
+        return audio
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def write_wav(output, audio: np.ndarray, sample_rate: int = SAMPLE_RATE):
+    with wave.open(output, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(to_int16(audio).tobytes())
+
+
+def read_wav(data: bytes) -> tuple[bytes, int]:
+    with wave.open(io.BytesIO(data), "rb") as wav_file:
+        if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+            raise UnsupportedAudioFormat("Only mono 16-bit WAV audio can be re-encoded")
+        return wav_file.readframes(wav_file.getnframes()), wav_file.getframerate()
+
+
+def accept_format(accept: Optional[str]) -> str:
+    best, best_quality = "wav", 0.0
+    for item in (accept or "").split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        fmt = ACCEPT_TYPES.get(media_type.lower())
+        if fmt is None:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > best_quality:
+            best, best_quality = fmt, quality
+    return best
+
+
+def negotiate_encoding(format: Optional[str] = None, sample_rate: Optional[int] = None,
+                       bits: Optional[int] = None, accept: Optional[str] = None) -> AudioEncoding:
+    fmt = (format or accept_format(accept)).lower()
+    if fmt not in AUDIO_FORMATS:
+        raise UnsupportedAudioFormat(
+            f"Unsupported audio format '{fmt}', expected one of {', '.join(AUDIO_FORMATS)}")
+
+    if fmt == "wav":
+        bits = bits or 16
+        if bits not in WAV_BITS:
+            raise UnsupportedAudioFormat(f"WAV bit depth must be one of {WAV_BITS}")
+        if sample_rate is not None and not WAV_RATES[0] <= sample_rate <= WAV_RATES[1]:
+            raise UnsupportedAudioFormat(
+                f"WAV sample rate must be between {WAV_RATES[0]} and {WAV_RATES[1]} Hz")
+        return AudioEncoding("wav", sample_rate, bits)
+
+    rates = ENCODERS[fmt][2]
+    if sample_rate is not None and sample_rate not in rates:
+        raise UnsupportedAudioFormat(f"{fmt} sample rate must be one of {rates}")
+    if bits not in (None, 16):
+        raise UnsupportedAudioFormat(f"Bit depth cannot be selected for {fmt}")
+    bitrate = settings.AUDIO_OPUS_BITRATE if fmt == "opus" else settings.AUDIO_MP3_BITRATE
+    return AudioEncoding(fmt, sample_rate, 16, bitrate)
+
+
+def resample_pcm(pcm: bytes, sample_rate: int, target_rate: int) -> np.ndarray:
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    if target_rate == sample_rate or len(samples) == 0:
+        return samples
+
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=target_rate)
+    frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="s16", layout="mono")
+    frame.sample_rate = sample_rate
+    chunks = [resampled.to_ndarray().reshape(-1) for resampled in resampler.resample(frame)]
+    chunks.extend(resampled.to_ndarray().reshape(-1) for resampled in resampler.resample(None))
+    return np.concatenate(chunks) if chunks else samples[:0]
+
+
+def encode_wav(pcm: bytes, sample_rate: int, target_rate: int, bits: int) -> Iterator[bytes]:
+    samples = resample_pcm(pcm, sample_rate, target_rate)
+    if bits == 8:
+        samples = ((samples >> 8) + 128).astype(np.uint8)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(bits // 8)
+        wav_file.setframerate(target_rate)
+        wav_file.writeframes(samples.tobytes())
+
+    data = buffer.getbuffer()
+    for start in range(0, len(data), STREAM_CHUNK_BYTES):
+        yield bytes(data[start:start + STREAM_CHUNK_BYTES])
+
+
+class ChunkWriter:
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> list[bytes]:
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def encode_audio(pcm: bytes, sample_rate: int, encoding: AudioEncoding) -> Iterator[bytes]:
+    if encoding.format == "wav":
+        yield from encode_wav(
+            pcm, sample_rate, encoding.sample_rate or sample_rate, encoding.bits)
+        return
+
+    container_format, codec, rates = ENCODERS[encoding.format]
+    rate = encoding.sample_rate
+    if rate is None:
+        rate = min((r for r in rates if r >= sample_rate), default=rates[-1])
+
+    output = ChunkWriter()
+    container = av.open(output, mode="w", format=container_format)
+    try:
+        stream = container.add_stream(codec, rate=rate, layout="mono")
+        if encoding.bitrate:
+            stream.bit_rate = encoding.bitrate
+
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        for start in range(0, len(samples), ENCODE_FRAME_SAMPLES):
+            chunk = samples[start:start + ENCODE_FRAME_SAMPLES]
+            frame = av.AudioFrame.from_ndarray(
+                chunk.reshape(1, -1), format="s16", layout="mono")
+            frame.sample_rate = sample_rate
+            for packet in stream.encode(frame):
+                container.mux(packet)
+            yield from output.drain()
+
+        for packet in stream.encode(None):
+            container.mux(packet)
+    finally:
+        container.close()
+    yield from output.drain()
+
+
+def tee_chunks(chunks: Iterable[bytes], on_complete: Callable[[bytes], None]) -> Iterator[bytes]:
+    collected = []
+    for chunk in chunks:
+        collected.append(chunk)
+        yield chunk
+    on_complete(b"".join(collected))
+
+
+def save_debug_capture(directory: Path, name: str, data: bytes) -> Path:
+    directory.mkdir(exist_ok=True, parents=True)
+    path = directory / Path(name).name
+    path.write_bytes(data)
+    return path
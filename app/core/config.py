@@ -1,12 +1,88 @@
 from pydantic_settings import BaseSettings
+from typing import Optional
 
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Whisper API"
     TEMP_AUDIO_DIR: str = "temp_audio"
+    AUDIO_DEBUG_CAPTURE: bool = False
+    WHISPER_BACKEND: str = "faster-whisper"
     WHISPER_MODEL_SIZE: str = "medium"
+    WHISPER_TIERED: bool = True
+    WHISPER_FAST_MODEL_SIZE: str = "small"
+    WHISPER_ESCALATE_AVG_LOGPROB: float = -0.5
+    WHISPER_ESCALATE_NO_SPEECH_PROB: float = 0.5
     WHISPER_DEVICE: str = "auto"
     WHISPER_COMPUTE_TYPE: str = "int8"
+    WHISPER_CPU_THREADS: int = 8
+    WHISPER_LANGUAGE: str = "es"
+    WHISPER_BEAM_SIZE: int = 5
+    WHISPER_MODEL_DIR: str = "models/whisper"
+    WHISPER_CPP_CLI_PATH: str = "whisper.cpp/build/bin/whisper-cli"
+    WHISPER_CPP_MODEL_PATH: str = "whisper.cpp/models/ggml-medium.bin"
+    VAD_ENABLED: bool = True
+    VAD_THRESHOLD_DB: float = -45.0
+    VAD_MARGIN_DB: float = 10.0
+    VAD_PADDING_MS: int = 200
+    VAD_MIN_SPEECH_MS: int = 250
+    LIVE_END_SILENCE_MS: int = 700
+    LIVE_PARTIAL_INTERVAL_MS: int = 800
+    LIVE_MAX_SECONDS: float = 15.0
+    LIVE_FRAME_TIMEOUT: float = 2.0
+    LIVE_EARLY_PREFILL: bool = True
+    LIVE_PREFILL_MIN_WORDS: int = 2
+    LLM_MODEL_PATH: str = "models/soob3123_amoral-gemma3-12B-Q4_K_M.gguf"
+    LLM_MODEL_URL: str = "https://huggingface.co/bartowski/soob3123_amoral-gemma3-12B-GGUF/resolve/main/soob3123_amoral-gemma3-12B-Q4_K_M.gguf"
+    LLM_PREFIX_CACHE: bool = True
+    LLM_MAX_TOKENS: int = 200
+    SESSION_MAX_TURNS: int = 6
+    SESSION_TTL: int = 900
+    SESSION_CACHE_BYTES: int = 2 * 1024 * 1024 * 1024
+    SESSION_MAX_SESSIONS: int = 256
+    SESSION_SPILL_DIR: Optional[str] = None
+    TTS_MODEL_PATH: str = "models/es_AR-daniela-high.onnx"
+    TTS_MODEL_URL: str = "https://huggingface.co/rhasspy/piper-voices/resolve/main/es/es_AR/daniela/high/es_AR-daniela-high.onnx"
+    TTS_CACHE_BYTES: int = 64 * 1024 * 1024
+    TTS_CACHE_DIR: Optional[str] = None
+    TTS_CACHE_DISK_MAX_CHARS: int = 120
+    TTS_PREWARM: bool = True
+    AUDIO_STORE_BYTES: int = 128 * 1024 * 1024
+    AUDIO_STORE_TTL: int = 300
+    AUDIO_STORE_SPILL_DIR: Optional[str] = None
+    AUDIO_STORE_SPILL_BYTES: int = 4 * 1024 * 1024
+    AUDIO_OPUS_BITRATE: int = 24000
+    AUDIO_MP3_BITRATE: int = 48000
+    LLM_WORKERS: int = 1
+    LLM_MAX_QUEUE: int = 4
+    STT_WORKERS: int = 1
+    STT_MAX_QUEUE: int = 8
+    TTS_WORKERS: int = 1
+    TTS_MAX_QUEUE: int = 8
+    INFERENCE_RETRY_AFTER: int = 5
+    CPU_THREADS: Optional[int] = None
+    TTS_THREADS: int = 2
+    LLM_MIN_THREADS: int = 2
+    THREAD_PINNING: bool = False
+    MODEL_RETRY_AFTER: int = 30
+    INFERENCE_SERVER_SOCKET: Optional[str] = None
+    INFERENCE_SERVER_AUTHKEY: Optional[str] = None
+    MODEL_MANIFEST_PATH: str = "models/manifest.json"
+    MODEL_MIRROR_DIR: Optional[str] = None
+    MODEL_MIRROR_URL: Optional[str] = None
+    MODEL_DOWNLOAD_WORKERS: int = 4
+    INTENT_FAST_PATH: bool = True
+    INTENT_MIN_CONFIDENCE: float = 0.8
+    RESPONSE_CACHE: bool = True
+    RESPONSE_CACHE_SIZE: int = 512
+    RESPONSE_CACHE_TTL: int = 300
+    RESPONSE_CACHE_TEMPERATURE_BUCKET: float = 1.0
+    RESPONSE_CACHE_HUMIDITY_BUCKET: float = 5.0
+    RESPONSE_CACHE_LIGHT_BUCKET: float = 10.0
+    SENSOR_STREAM_BUFFER: int = 16
+    SENSOR_STREAM_KEEPALIVE: int = 30
+    SENSOR_HISTORY_CAPACITY: int = 86400
+    SENSOR_HISTORY_SNAPSHOT_PATH: Optional[str] = None
+    SENSOR_HISTORY_SNAPSHOT_INTERVAL: int = 60
 
     class Config:
         env_file = ".env"
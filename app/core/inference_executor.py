@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import threading
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class InferenceQueueFull(Exception):
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"Inference queue '{pool}' is full")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class InferencePool:
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"{name}-inference")
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    def _done(self, future):
+        with self.lock:
+            self.pending -= 1
+            self.completed += 1
+
+    def submit(self, fn, *args, **kwargs):
+        with self.lock:
+            if self.pending >= self.capacity:
+                self.rejected += 1
+                raise InferenceQueueFull(
+                    self.name, settings.INFERENCE_RETRY_AFTER)
+            self.pending += 1
+
+        future = self.executor.submit(functools.partial(fn, *args, **kwargs))
+        future.add_done_callback(self._done)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "name": self.name,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "pending": self.pending,
+                "queued": max(self.pending - self.workers, 0),
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+class InferenceExecutor:
+    def __init__(self):
+        self.pools = {
+            "llm": InferencePool("llm", settings.LLM_WORKERS, settings.LLM_MAX_QUEUE),
+            "stt": InferencePool("stt", settings.STT_WORKERS, settings.STT_MAX_QUEUE),
+            "tts": InferencePool("tts", settings.TTS_WORKERS, settings.TTS_MAX_QUEUE),
+        }
+
+    def pool(self, name: str) -> InferencePool:
+        return self.pools[name]
+
+    async def run(self, pool: str, fn, *args, **kwargs):
+        return await self.pools[pool].run(fn, *args, **kwargs)
+
+    def shutdown(self):
+        for pool in self.pools.values():
+            pool.shutdown()
+
+    def stats(self) -> list[dict]:
+        return [pool.stats() for pool in self.pools.values()]
+
+
+inference_executor = InferenceExecutor()
+
+metrics.gauge(
+    "inference_queue_depth", "Inference jobs waiting or running per pool", ("pool",),
+    callback=lambda: [({"pool": s["name"]}, s["pending"]) for s in inference_executor.stats()])
+metrics.counter(
+    "inference_rejected_total", "Inference jobs rejected because the queue was full", ("pool",),
+    callback=lambda: [({"pool": s["name"]}, s["rejected"]) for s in inference_executor.stats()])
@@ -0,0 +1,160 @@
+from contextlib import contextmanager
+from typing import Callable, Optional
+import bisect
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{key}="{str(value)}"'.replace("\n", " ") for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (),
+                 callback: Optional[Callable] = None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.values: dict[tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def label_key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> list[tuple]:
+        if self.callback is not None:
+            return [(self.name, labels, value) for labels, value in self.callback()]
+        with self.lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value)
+                    for key, value in self.values.items()]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            if value is None:
+                continue
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[self.label_key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self.label_key(labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> list[tuple]:
+        samples = []
+        with self.lock:
+            for key, (counts, total, count) in self.series.items():
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append(
+                        (f"{self.name}_bucket", {**labels, "le": bound}, cumulative))
+                samples.append(
+                    (f"{self.name}_bucket", {**labels, "le": "+Inf"}, count))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple = (),
+                callback: Optional[Callable] = None) -> Counter:
+        return self.register(Counter(name, help, labelnames, callback))
+
+    def gauge(self, name: str, help: str, labelnames: tuple = (),
+              callback: Optional[Callable] = None) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, callback))
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                print(f"✗ Error collecting metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+stage_seconds = metrics.histogram(
+    "voice_stage_seconds", "Duration of each voice pipeline stage", ("stage",))
+
+http_request_seconds = metrics.histogram(
+    "http_request_seconds", "HTTP request duration by route", ("method", "route", "status"))
+
+llm_decode_tokens_per_second = metrics.histogram(
+    "llm_decode_tokens_per_second", "LLM decode throughput per generation",
+    buckets=(1, 2, 4, 6, 8, 10, 15, 20, 30, 50, 100))
+
+llm_generated_tokens = metrics.counter(
+    "llm_generated_tokens_total", "Tokens generated by the LLM")
+
+mqtt_messages = metrics.counter(
+    "mqtt_messages_total", "Sensor messages received over MQTT")
+
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage=stage)
@@ -1,43 +1,350 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.parse
 import urllib.request
+from app.core.config import settings
 
+CHUNK_BYTES = 32 * 1024 * 1024
+BLOCK_BYTES = 1024 * 1024
+RETRIES = 3
+MAX_REDIRECTS = 5
+PROGRESS_INTERVAL = 2.0
+USER_AGENT = "alexa-de-temu-model-downloader"
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+SHA256 = re.compile(r"^[0-9a-f]{64}$")
 
-def download_model(url: str, output_path: Path):
-    if output_path.exists():
+manifest_lock = threading.Lock()
+
+
+class RemoteFile:
+    def __init__(self, url: str, size: Optional[int] = None,
+                 sha256: Optional[str] = None, ranges: bool = False):
+        self.url = url
+        self.size = size
+        self.sha256 = sha256
+        self.ranges = ranges
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+no_redirect_opener = urllib.request.build_opener(NoRedirect)
+
+
+class Progress:
+    def __init__(self, name: str, total: Optional[int], done: int = 0):
+        self.name = name
+        self.total = total
+        self.done = done
+        self.start = time.perf_counter()
+        self.start_done = done
+        self.last_report = self.start
+        self.lock = threading.Lock()
+
+    def add(self, amount: int):
+        with self.lock:
+            self.done += amount
+            now = time.perf_counter()
+            if now - self.last_report >= PROGRESS_INTERVAL:
+                self.last_report = now
+                self.report(now)
+
+    def report(self, now: float):
+        speed = (self.done - self.start_done) / max(now - self.start, 1e-6)
+        done_mb = self.done / 1024 ** 2
+        if self.total:
+            print(
+                f"⬇ {self.name}: {self.done / self.total * 100:5.1f}% "
+                f"({done_mb:.1f}/{self.total / 1024 ** 2:.1f} MB, {speed / 1024 ** 2:.1f} MB/s)")
+        else:
+            print(f"⬇ {self.name}: {done_mb:.1f} MB ({speed / 1024 ** 2:.1f} MB/s)")
+
+    def finish(self):
+        with self.lock:
+            self.report(time.perf_counter())
+
+
+def request(url: str, method: str = "GET", headers: Optional[dict] = None):
+    return urllib.request.Request(
+        url, method=method, headers={"User-Agent": USER_AGENT, **(headers or {})})
+
+
+def linked_sha256(headers) -> Optional[str]:
+    etag = (headers.get("x-linked-etag") or "").strip('"').lower()
+    return etag if SHA256.match(etag) else None
+
+
+def header_int(headers, *names: str) -> Optional[int]:
+    for name in names:
+        value = headers.get(name)
+        if value and value.isdigit():
+            return int(value)
+    return None
+
+
+def probe(url: str) -> RemoteFile:
+    size = None
+    sha256 = None
+    for _ in range(MAX_REDIRECTS):
+        try:
+            response = no_redirect_opener.open(request(url, "HEAD"), timeout=30)
+        except urllib.error.HTTPError as e:
+            if e.code not in REDIRECT_CODES:
+                raise
+            sha256 = sha256 or linked_sha256(e.headers)
+            size = size or header_int(e.headers, "x-linked-size")
+            url = urllib.parse.urljoin(url, e.headers["Location"])
+            continue
+
+        with response:
+            headers = response.headers
+            return RemoteFile(
+                url,
+                size or header_int(headers, "x-linked-size", "Content-Length"),
+                sha256 or linked_sha256(headers),
+                headers.get("Accept-Ranges", "").lower() == "bytes"
+            )
+
+    raise RuntimeError(f"Too many redirects while resolving {url}")
+
+
+def load_manifest() -> dict:
+    path = Path(settings.MODEL_MANIFEST_PATH)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_manifest_entry(name: str, size: int, sha256: Optional[str]):
+    path = Path(settings.MODEL_MANIFEST_PATH)
+    with manifest_lock:
+        manifest = load_manifest()
+        entry = {"size": size}
+        if sha256 is not None:
+            entry["sha256"] = sha256
+        manifest[name] = entry
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        os.replace(tmp_path, path)
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(8 * BLOCK_BYTES):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def with_retries(fn, *args):
+    for attempt in range(1, RETRIES + 1):
+        try:
+            return fn(*args)
+        except (urllib.error.URLError, OSError, RuntimeError) as e:
+            if attempt == RETRIES:
+                raise
+            print(f"⚠ Download error ({e}), retrying in {attempt * 2}s...")
+            time.sleep(attempt * 2)
+
+
+def fetch_range(url: str, part: Path, start: int, end: int, progress: Progress):
+    offset = start
+    try:
+        with urllib.request.urlopen(
+                request(url, headers={"Range": f"bytes={start}-{end - 1}"}), timeout=60) as response:
+            if response.status != 206:
+                raise RuntimeError("Server ignored the range request")
+            fd = os.open(part, os.O_WRONLY)
+            try:
+                while offset < end and (block := response.read(min(BLOCK_BYTES, end - offset))):
+                    os.pwrite(fd, block, offset)
+                    offset += len(block)
+                    progress.add(len(block))
+            finally:
+                os.close(fd)
+        if offset != end:
+            raise RuntimeError(f"Short read for bytes {start}-{end - 1}")
+    except BaseException:
+        progress.add(start - offset)
+        raise
+
+
+def fetch_parallel(url: str, part: Path, size: int, progress: Progress):
+    state_path = part.with_name(part.name + ".json")
+    chunks = [(start, min(start + CHUNK_BYTES, size)) for start in range(0, size, CHUNK_BYTES)]
+    done = set()
+
+    if state_path.exists():
+        # The chunks it lists only exist in a .part preallocated to the full
+        # size; a recreated one would keep them zero-filled.
+        state = json.loads(state_path.read_text())
+        if state.get("size") == size and state.get("chunk_bytes") == CHUNK_BYTES and \
+                part.exists() and part.stat().st_size == size:
+            done = set(state["done"])
+    elif part.exists():
+        prefix = part.stat().st_size
+        done = {index for index, (_, end) in enumerate(chunks) if end <= prefix}
+
+    state_lock = threading.Lock()
+
+    def save_state():
+        state_path.write_text(json.dumps(
+            {"size": size, "chunk_bytes": CHUNK_BYTES, "done": sorted(done)}))
+
+    save_state()
+    with open(part, "ab"):
+        pass
+    os.truncate(part, size)
+    progress.done = progress.start_done = sum(
+        end - start for index, (start, end) in enumerate(chunks) if index in done)
+
+    def fetch_chunk(index: int):
+        start, end = chunks[index]
+        with_retries(fetch_range, url, part, start, end, progress)
+        with state_lock:
+            done.add(index)
+            save_state()
+
+    pending = [index for index in range(len(chunks)) if index not in done]
+    with ThreadPoolExecutor(max_workers=settings.MODEL_DOWNLOAD_WORKERS) as pool:
+        list(pool.map(fetch_chunk, pending))
+
+
+def fetch_stream(url: str, part: Path, progress: Progress):
+    offset = part.stat().st_size if part.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    try:
+        response = urllib.request.urlopen(request(url, headers=headers), timeout=60)
+    except urllib.error.HTTPError as e:
+        if e.code != 416 or not offset:
+            raise
+        # Nothing left past the offset: the .part is already complete and
+        # goes straight to verification.
+        progress.done = progress.start_done = offset
         return
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with response:
+        if response.status != 206:
+            offset = 0
+        progress.done = progress.start_done = offset
+        with open(part, "r+b" if part.exists() else "wb") as f:
+            f.seek(offset)
+            f.truncate()
+            while block := response.read(BLOCK_BYTES):
+                f.write(block)
+                progress.add(len(block))
 
-    print(f"Downloading {output_path.name}...")
-    urllib.request.urlretrieve(url, output_path)
-    print(f"Downloaded {output_path.name}")
 
+def mirror_path(name: str) -> Optional[Path]:
+    if not settings.MODEL_MIRROR_DIR:
+        return None
+    path = Path(settings.MODEL_MIRROR_DIR) / name
+    return path if path.exists() else None
 
-def download_llm_model():
-    model_path = Path("models/soob3123_amoral-gemma3-12B-Q4_K_M.gguf")
 
-    if model_path.exists():
-        print("LLM model already exists, skipping download")
+def mirror_url(url: str, name: str) -> str:
+    if not settings.MODEL_MIRROR_URL:
+        return url
+    return f"{settings.MODEL_MIRROR_URL.rstrip('/')}/{urllib.parse.quote(name)}"
+
+
+def check_existing(url: str, output_path: Path, expected: dict) -> bool:
+    actual = output_path.stat().st_size
+    size = expected.get("size")
+    if size is None:
+        try:
+            size = probe(mirror_url(url, output_path.name)).size
+        except (urllib.error.URLError, OSError) as e:
+            print(f"⚠ Could not verify {output_path.name} ({e}), using it as is")
+            return True
+        if size is None or actual == size:
+            save_manifest_entry(output_path.name, actual, None)
+            return True
+
+    if actual == size:
+        return True
+    if actual > size:
+        print(f"⚠ {output_path.name} has {actual} bytes, expected {size}; downloading again")
+        output_path.unlink()
+        return False
+
+    print(f"⚠ {output_path.name} has {actual} of {size} bytes, resuming download")
+    os.replace(output_path, output_path.with_name(output_path.name + ".part"))
+    return False
+
+
+def download_model(url: str, output_path: Path):
+    output_path = Path(output_path)
+    name = output_path.name
+    expected = load_manifest().get(name, {})
+
+    if output_path.exists() and check_existing(url, output_path, expected):
         return
 
-    url = "https://huggingface.co/bartowski/soob3123_amoral-gemma3-12B-GGUF/resolve/main/soob3123_amoral-gemma3-12B-Q4_K_M.gguf?download=true"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    part = output_path.with_name(name + ".part")
 
-    model_path.parent.mkdir(parents=True, exist_ok=True)
+    mirror = mirror_path(name)
+    if mirror is not None:
+        print(f"Copying {name} from mirror {mirror.parent}...")
+        shutil.copyfile(mirror, part)
+        size = expected.get("size")
+        sha256 = expected.get("sha256")
+    else:
+        source = mirror_url(url, name)
+        remote = probe(source)
+        size = expected.get("size") or remote.size
+        sha256 = expected.get("sha256") or remote.sha256
+        progress = Progress(name, size)
 
-    print("Downloading LLM model (7.3GB)...")
-    urllib.request.urlretrieve(url, model_path)
-    print("LLM model downloaded!")
+        print(f"Downloading {name}...")
+        if remote.ranges and size and size > CHUNK_BYTES and settings.MODEL_DOWNLOAD_WORKERS > 1:
+            fetch_parallel(source, part, size, progress)
+        else:
+            state_path = part.with_name(part.name + ".json")
+            if state_path.exists():
+                part.unlink(missing_ok=True)
+                state_path.unlink()
+            if size is not None and part.exists() and part.stat().st_size > size:
+                part.unlink()
+            if size is None or not part.exists() or part.stat().st_size < size:
+                with_retries(fetch_stream, source, part, progress)
+        progress.finish()
 
+    actual = part.stat().st_size
+    if size is not None and actual != size:
+        part.unlink()
+        raise RuntimeError(f"{name}: expected {size} bytes, got {actual}")
 
-def ensure_models():
-    download_llm_model()
+    digest = file_sha256(part)
+    if sha256 is not None and digest != sha256:
+        part.unlink()
+        raise RuntimeError(f"{name}: SHA256 mismatch (expected {sha256}, got {digest})")
 
-    models_dir = Path("models")
+    os.replace(part, output_path)
+    part.with_name(part.name + ".json").unlink(missing_ok=True)
+    save_manifest_entry(name, actual, digest)
+    print(f"Downloaded {name} ({actual / 1024 ** 2:.1f} MB, sha256 {digest[:12]}…)")
+
+
+def download_llm_model():
+    download_model(settings.LLM_MODEL_URL, Path(settings.LLM_MODEL_PATH))
 
-    model_files = {
-        "es_AR-daniela-high.onnx": "https://huggingface.co/rhasspy/piper-voices/resolve/main/es/es_AR/daniela/high/es_AR-daniela-high.onnx",
-        "es_AR-daniela-high.onnx.json": "https://huggingface.co/rhasspy/piper-voices/resolve/main/es/es_AR/daniela/high/es_AR-daniela-high.onnx.json"
-    }
 
-    for filename, url in model_files.items():
-        download_model(url, models_dir / filename)
+def download_tts_model():
+    model_path = Path(settings.TTS_MODEL_PATH)
+    download_model(settings.TTS_MODEL_URL, model_path)
+    download_model(f"{settings.TTS_MODEL_URL}.json", model_path.with_name(model_path.name + ".json"))
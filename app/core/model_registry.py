@@ -0,0 +1,228 @@
+from contextlib import contextmanager
+from typing import Callable, Optional
+import gc
+import threading
+import time
+import psutil
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.thread_budget import thread_budget
+
+STATUSES = ("pending", "downloading", "loading", "warming", "ready", "failed")
+
+
+class ModelNotReady(Exception):
+    def __init__(self, name: str, status: str, retry_after: int):
+        super().__init__(f"Model '{name}' is not ready ({status})")
+        self.name = name
+        self.status = status
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        return (ModelNotReady, (self.name, self.status, self.retry_after))
+
+
+class ModelHandle:
+    def __init__(self, name: str, loader: Callable, download: Optional[Callable] = None,
+                 warmup: Optional[Callable] = None):
+        self.name = name
+        self.loader = loader
+        self.download = download
+        self.warmup = warmup
+        self.instance = None
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.load_time: Optional[float] = None
+        self.warmup_time: Optional[float] = None
+        self.memory_bytes: Optional[int] = None
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.instance is not None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def prepare(self):
+        thread_budget.pin(self.name)
+        try:
+            if self.download is not None:
+                self.status = "downloading"
+                self.download()
+
+            self.status = "loading"
+            instance = self.load()
+
+            self.status = "warming"
+            self.warm(instance)
+            self.status = "ready"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            print(f"✗ Model '{self.name}' failed to start: {e}")
+
+    def warm(self, instance):
+        if self.warmup is None and not callable(getattr(instance, "warmup", None)):
+            return
+
+        start = time.perf_counter()
+        with self.lock:
+            if self.warmup is not None:
+                self.warmup(instance)
+            else:
+                instance.warmup()
+        self.warmup_time = time.perf_counter() - start
+        print(f"✓ Model '{self.name}' warmed up in {self.warmup_time:.2f}s")
+
+    def require(self):
+        if not self.ready:
+            raise ModelNotReady(self.name, self.status, settings.MODEL_RETRY_AFTER)
+
+    def load(self):
+        with self.load_lock:
+            if self.instance is not None:
+                return self.instance
+
+            process = psutil.Process()
+            rss_before = process.memory_info().rss
+            start = time.perf_counter()
+
+            print(f"📦 Loading model '{self.name}'...")
+            instance = self.loader()
+
+            self.load_time = time.perf_counter() - start
+            self.memory_bytes = max(process.memory_info().rss - rss_before, 0)
+            self.loaded_at = time.time()
+            self.instance = instance
+            print(
+                f"✓ Model '{self.name}' loaded in {self.load_time:.2f}s "
+                f"({self.memory_bytes / 1024 ** 2:.1f} MB)")
+            return instance
+
+    def get(self):
+        self.require()
+        return self.instance
+
+    @contextmanager
+    def acquire(self):
+        instance = self.get()
+        with self.lock, thread_budget.stage(self.name):
+            yield instance
+
+    def call(self, method: str, *args, **kwargs):
+        with self.acquire() as instance:
+            return getattr(instance, method)(*args, **kwargs)
+
+    def unload(self):
+        if not self.load_lock.acquire(blocking=False):
+            print(f"⚠ Model '{self.name}' is still loading, skipping unload")
+            return
+
+        try:
+            with self.lock:
+                if self.instance is None:
+                    return
+                close = getattr(self.instance, "close", None)
+                if callable(close):
+                    close()
+                self.instance = None
+                self.status = "pending"
+                self.memory_bytes = None
+                self.loaded_at = None
+                gc.collect()
+                print(f"✓ Model '{self.name}' unloaded")
+        finally:
+            self.load_lock.release()
+
+    def stats(self) -> dict:
+        data = {
+            "name": self.name,
+            "status": self.status,
+            "error": self.error,
+            "loaded": self.loaded,
+            "busy": self.lock.locked(),
+            "load_time": self.load_time,
+            "warmup_time": self.warmup_time,
+            "memory_bytes": self.memory_bytes,
+            "loaded_at": self.loaded_at,
+        }
+        service_stats = getattr(self.instance, "stats", None)
+        if callable(service_stats):
+            data["service"] = service_stats()
+        return data
+
+
+class ModelRegistry:
+    def __init__(self):
+        self.handles: dict[str, ModelHandle] = {}
+
+    def register(self, name: str, loader: Callable, download: Optional[Callable] = None,
+                 warmup: Optional[Callable] = None) -> ModelHandle:
+        handle = ModelHandle(name, loader, download, warmup)
+        self.handles[name] = handle
+        return handle
+
+    def handle(self, name: str) -> ModelHandle:
+        if name not in self.handles:
+            raise KeyError(f"Model '{name}' is not registered")
+        return self.handles[name]
+
+    def get(self, name: str):
+        return self.handle(name).get()
+
+    def acquire(self, name: str):
+        return self.handle(name).acquire()
+
+    def require(self, *names: str):
+        for name in names:
+            self.handle(name).require()
+
+    def start(self) -> list[threading.Thread]:
+        threads = []
+        for handle in self.handles.values():
+            if handle.status != "pending":
+                continue
+            thread = threading.Thread(
+                target=handle.prepare, name=f"model-{handle.name}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def prepare_all(self):
+        for thread in self.start():
+            thread.join()
+
+    @property
+    def ready(self) -> bool:
+        return all(handle.ready for handle in self.handles.values())
+
+    def unload(self, name: str):
+        self.handle(name).unload()
+
+    def unload_all(self):
+        for handle in self.handles.values():
+            handle.unload()
+
+    def stats(self) -> list[dict]:
+        return [handle.stats() for handle in self.handles.values()]
+
+
+model_registry = ModelRegistry()
+
+metrics.gauge(
+    "model_memory_bytes", "Resident memory added when each model was loaded", ("model",),
+    callback=lambda: [({"model": s["name"]}, s["memory_bytes"]) for s in model_registry.stats()])
+metrics.gauge(
+    "model_ready", "Whether each model has loaded and warmed up", ("model",),
+    callback=lambda: [({"model": s["name"]}, int(s["status"] == "ready"))
+                      for s in model_registry.stats()])
+metrics.gauge(
+    "model_load_seconds", "Time taken to load each model", ("model",),
+    callback=lambda: [({"model": s["name"]}, s["load_time"]) for s in model_registry.stats()])
+metrics.gauge(
+    "process_resident_memory_bytes", "Resident memory of the API process",
+    callback=lambda: [({}, psutil.Process().memory_info().rss)])
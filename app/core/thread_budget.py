@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+from typing import Optional
+import os
+import threading
+from app.core.config import settings
+from app.core.metrics import metrics
+
+ENGINES = ("llm", "whisper", "tts")
+
+
+def available_cpus() -> list[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class ThreadBudget:
+    def __init__(self, total: Optional[int], whisper_threads: int, tts_threads: int,
+                 llm_min_threads: int, pinning: bool):
+        self.cpus = available_cpus()
+        self.total = max(min(total or len(self.cpus), len(self.cpus)), 1)
+        self.threads = {
+            "whisper": max(min(whisper_threads, self.total), 1),
+            "tts": max(min(tts_threads, self.total), 1),
+        }
+        self.llm_min_threads = max(min(llm_min_threads, self.total), 1)
+        self.active = {engine: 0 for engine in ENGINES}
+        self.lock = threading.Lock()
+        self.cpu_sets = self.partition() if pinning and hasattr(os, "sched_setaffinity") else {}
+
+    def partition(self) -> dict[str, set[int]]:
+        cpus = self.cpus[:self.total]
+        tts = cpus[-self.threads["tts"]:]
+        remaining = cpus[:-self.threads["tts"]] or cpus
+        whisper = remaining[-self.threads["whisper"]:]
+        return {"llm": set(cpus), "whisper": set(whisper), "tts": set(tts)}
+
+    def threads_for(self, engine: str) -> int:
+        if engine == "llm":
+            return self.llm_threads()
+        return self.threads[engine]
+
+    def llm_threads(self) -> int:
+        with self.lock:
+            busy = sum(self.threads[engine] * self.active[engine] for engine in self.threads)
+        return max(self.total - busy, self.llm_min_threads)
+
+    def pin(self, engine: str):
+        cpus = self.cpu_sets.get(engine)
+        if cpus:
+            os.sched_setaffinity(0, cpus)
+
+    @contextmanager
+    def stage(self, engine: str):
+        if engine not in self.active:
+            yield
+            return
+
+        self.pin(engine)
+        with self.lock:
+            self.active[engine] += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active[engine] -= 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            active = dict(self.active)
+        return {
+            "total": self.total,
+            "threads": {**self.threads, "llm": self.llm_threads()},
+            "active": active,
+            "cpu_sets": {engine: sorted(cpus) for engine, cpus in self.cpu_sets.items()},
+        }
+
+
+thread_budget = ThreadBudget(
+    settings.CPU_THREADS,
+    settings.WHISPER_CPU_THREADS,
+    settings.TTS_THREADS,
+    settings.LLM_MIN_THREADS,
+    settings.THREAD_PINNING
+)
+
+metrics.gauge(
+    "thread_budget_threads", "Threads assigned to each inference engine", ("engine",),
+    callback=lambda: [({"engine": engine}, threads)
+                      for engine, threads in thread_budget.stats()["threads"].items()])
+metrics.gauge(
+    "thread_budget_active_stages", "Inference stages currently running per engine", ("engine",),
+    callback=lambda: [({"engine": engine}, count)
+                      for engine, count in thread_budget.active.items()])
@@ -0,0 +1,130 @@
+from multiprocessing.connection import (
+    AuthenticationError, Connection, Listener, answer_challenge, deliver_challenge)
+from pathlib import Path
+import argparse
+import os
+import secrets
+import tempfile
+import threading
+from app.core.config import settings
+from app.core.model_registry import model_registry
+from app.services.inference_client import (
+    attach_arrays, authkey_path, portable_error, release_segments)
+
+DEFAULT_SOCKET = os.path.join(
+    tempfile.gettempdir(), f"alexa-inference-{os.getuid()}", "inference.sock")
+UNLOCKED_METHODS = {"stats", "sample_rate", "record_turn"}
+
+
+def call_model(model: str, method: str, args: tuple, kwargs: dict):
+    handle = model_registry.handle(model)
+    if method in UNLOCKED_METHODS:
+        attribute = getattr(handle.get(), method)
+        return attribute(*args, **kwargs) if callable(attribute) else attribute
+
+    with handle.acquire() as instance:
+        return getattr(instance, method)(*args, **kwargs)
+
+
+def private_directory(path: Path):
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = path.stat()
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise RuntimeError(
+            f"{path} must be owned by this user and closed to group and others "
+            f"to hold the inference socket")
+
+
+def create_authkey(address: str) -> bytes:
+    if settings.INFERENCE_SERVER_AUTHKEY:
+        return settings.INFERENCE_SERVER_AUTHKEY.encode("utf-8")
+
+    key = secrets.token_bytes(32)
+    path = authkey_path(address)
+    path.unlink(missing_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def serve_connection(conn: Connection, authkey: bytes):
+    with conn:
+        # Messages are pickles, so nothing is read before the peer proves it
+        # holds the key. Done here rather than in accept() so a client that
+        # stalls mid-handshake cannot block other connections.
+        try:
+            deliver_challenge(conn, authkey)
+            answer_challenge(conn, authkey)
+        except (AuthenticationError, EOFError, OSError):
+            return
+
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            if message[0] == "status":
+                conn.send(("ok", {
+                    name: handle.status for name, handle in model_registry.handles.items()}))
+                continue
+
+            _, model, method, args, kwargs, stream = message
+            args, segments = attach_arrays(args)
+            try:
+                if stream:
+                    kwargs["emit"] = lambda *event: conn.send(("event", *event))
+                reply = ("ok", call_model(model, method, args, kwargs))
+            except Exception as e:
+                reply = ("error", portable_error(e))
+            finally:
+                args = None
+                release_segments(segments)
+
+            try:
+                conn.send(reply)
+            except (BrokenPipeError, OSError):
+                return
+
+
+def serve(address: str):
+    if not model_registry.handles:
+        from app.main import register_models
+        register_models(socket=None)
+
+    path = Path(address)
+    private_directory(path.parent)
+    authkey = create_authkey(address)
+    path.unlink(missing_ok=True)
+    # Bind before the model loaders start: the umask is process-wide.
+    umask = os.umask(0o177)
+    try:
+        listener = Listener(str(path), family="AF_UNIX")
+    finally:
+        os.umask(umask)
+    model_registry.start()
+    print(f"🧠 Inference server listening on {path}")
+
+    try:
+        while True:
+            conn = listener.accept()
+            threading.Thread(
+                target=serve_connection, args=(conn, authkey), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        model_registry.unload_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Own the LLM, Whisper and Piper models and serve them to API workers")
+    parser.add_argument("--socket", default=settings.INFERENCE_SERVER_SOCKET or DEFAULT_SOCKET)
+    args = parser.parse_args()
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,61 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Optional
+import asyncio
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.router import api_router
-from app.core.model_downloader import ensure_models
+from app.core.model_downloader import download_llm_model, download_tts_model
+from app.core.model_registry import model_registry, ModelNotReady
+from app.core.inference_executor import inference_executor, InferenceQueueFull
 from app.services.mqtt_service import mqtt_service
+from app.services.sensor_hub import sensor_hub
+from app.services.sensor_history import sensor_history
+from app.services.audio_store import audio_store
+from app.core.metrics import http_request_seconds
+from app.core.audio import UnsupportedAudioFormat
+from app.api.v1.endpoints import health, metrics
+from app.services.llm_service import LLMService, ERROR_ANSWER
+from app.services.intent_service import common_answers
+from app.services.whisper_service import WhisperService, NoSpeechDetected
+from app.services.tts_service import TTSService
+from app.services.inference_client import (
+    InferenceClient, RemoteLLMService, RemoteVoice, RemoteWhisperService)
+
+
+def warm_tts(tts: TTSService):
+    tts.warmup([ERROR_ANSWER, *common_answers()] if settings.TTS_PREWARM else None)
+
+
+def register_models(socket: Optional[str] = settings.INFERENCE_SERVER_SOCKET):
+    if socket:
+        client = InferenceClient(socket)
+        model_registry.register("llm", lambda: RemoteLLMService(client))
+        model_registry.register("whisper", lambda: RemoteWhisperService(client))
+        model_registry.register(
+            "tts", lambda: TTSService(voice=RemoteVoice(client)), warmup=warm_tts)
+        return
+
+    model_registry.register("llm", LLMService, download=download_llm_model)
+    model_registry.register("whisper", WhisperService)
+    model_registry.register("tts", TTSService, download=download_tts_model, warmup=warm_tts)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    ensure_models()
+    if not model_registry.handles:
+        register_models()
+    model_registry.start()
+    sensor_hub.bind(asyncio.get_running_loop())
     mqtt_service.start()
     yield
     mqtt_service.stop()
+    sensor_history.snapshot()
+    audio_store.clear()
+    inference_executor.shutdown()
+    model_registry.unload_all()
 
 
 app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
@@ -25,4 +68,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    http_request_seconds.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code
+    )
+    return response
+
+
+@app.exception_handler(InferenceQueueFull)
+async def inference_queue_full_handler(request: Request, exc: InferenceQueueFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Servidor ocupado ({exc.pool}), intente de nuevo más tarde."},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.exception_handler(ModelNotReady)
+async def model_not_ready_handler(request: Request, exc: ModelNotReady):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"El modelo '{exc.name}' aún se está cargando ({exc.status})."},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.exception_handler(NoSpeechDetected)
+async def no_speech_handler(request: Request, exc: NoSpeechDetected):
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+
+@app.exception_handler(UnsupportedAudioFormat)
+async def unsupported_audio_format_handler(request: Request, exc: UnsupportedAudioFormat):
+    return JSONResponse(status_code=406, content={"detail": str(exc)})
+
+
 app.include_router(api_router, prefix="/api/v1")
+app.include_router(metrics.router, tags=["metrics"])
+app.include_router(health.router, tags=["health"])
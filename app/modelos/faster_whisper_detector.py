@@ -0,0 +1,59 @@
+from faster_whisper import WhisperModel
+from typing import Union
+import numpy as np
+
+
+class FasterWhisperDetector:
+    def __init__(self, model_size: str, device: str = "auto", compute_type: str = "int8",
+                 cpu_threads: int = 0, language: str = "es", beam_size: int = 5,
+                 download_root: str = None):
+        self.language = language
+        self.beam_size = beam_size
+        self.model = WhisperModel(
+            model_size,
+            device=device,
+            compute_type=compute_type,
+            cpu_threads=cpu_threads,
+            download_root=download_root,
+        )
+
+    def transcribe(self, audio: Union[str, np.ndarray]) -> dict:
+        if isinstance(audio, np.ndarray) and audio.dtype == np.int16:
+            audio = audio.astype(np.float32) / 32768.0
+
+        segments, info = self.model.transcribe(
+            audio,
+            language=self.language,
+            beam_size=self.beam_size,
+        )
+
+        result_segments = [
+            {
+                "start": round(segment.start, 3),
+                "end": round(segment.end, 3),
+                "text": segment.text.strip(),
+                "avg_logprob": segment.avg_logprob,
+                "no_speech_prob": segment.no_speech_prob,
+            }
+            for segment in segments
+        ]
+
+        avg_logprob = None
+        no_speech_prob = None
+        if result_segments:
+            durations = np.array(
+                [max(s["end"] - s["start"], 1e-3) for s in result_segments])
+            avg_logprob = float(np.average(
+                [s["avg_logprob"] for s in result_segments], weights=durations))
+            no_speech_prob = max(s["no_speech_prob"] for s in result_segments)
+
+        return {
+            "text": " ".join(s["text"] for s in result_segments if s["text"]),
+            "segments": result_segments,
+            "duration": info.duration,
+            "avg_logprob": avg_logprob,
+            "no_speech_prob": no_speech_prob,
+        }
+
+    def getCleanTranscription(self, audio: Union[str, np.ndarray]) -> str:
+        return self.transcribe(audio)["text"]
@@ -1,30 +1,58 @@
 import subprocess
 from pathlib import Path
+from typing import Union
 import re
+import tempfile
+import numpy as np
+from app.core.audio import write_wav
+
+
+def parse_timestamp(value: str) -> float:
+    hours, minutes, seconds = value.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
 
 
 class WhisperDetector:
-    def __init__(self, whisper_cli_path: Path, model_path: Path):
+    def __init__(self, whisper_cli_path: Path, model_path: Path, threads: int = 8,
+                 language: str = "es"):
         self.whisper_cli_path = whisper_cli_path
         self.model_path = model_path
+        self.threads = threads
+        self.language = language
 
-    def getCleanTranscription(self, audio_path: str) -> str:
+    def transcribe(self, audio: Union[str, np.ndarray]) -> dict:
+        if isinstance(audio, np.ndarray):
+            with tempfile.NamedTemporaryFile(suffix=".wav") as wav_file:
+                write_wav(wav_file, audio)
+                wav_file.flush()
+                return self.transcribe(wav_file.name)
+
+        audio_path = audio
         result = subprocess.run([
             str(self.whisper_cli_path),
             "-m", str(self.model_path),
             "-f", audio_path,
-            "--threads", "8",
-            "--language", "es"
+            "--threads", str(self.threads),
+            "--language", self.language
         ], capture_output=True, text=True)
 
         if result.returncode != 0:
             raise RuntimeError(f"Error transcribiendo audio: {result.stderr}")
 
-        lines = []
+        segments = []
         for line in result.stdout.strip().split("\n"):
-            match = re.match(r"\[[^\]]+\]\s+(.*)", line)
+            match = re.match(r"\[([\d:.]+)\s+-->\s+([\d:.]+)\]\s+(.*)", line)
             if match:
-                lines.append(match.group(1).strip())
+                segments.append({
+                    "start": parse_timestamp(match.group(1)),
+                    "end": parse_timestamp(match.group(2)),
+                    "text": match.group(3).strip(),
+                })
+
+        return {
+            "text": " ".join(s["text"] for s in segments),
+            "segments": segments,
+        }
 
-        transcription = " ".join(lines)
-        return transcription
+    def getCleanTranscription(self, audio: Union[str, np.ndarray]) -> str:
+        return self.transcribe(audio)["text"]
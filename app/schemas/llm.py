@@ -1,8 +1,10 @@
 from pydantic import BaseModel
+from typing import Optional
 
 
 class SmartHomeRequest(BaseModel):
     request: str
+    session_id: Optional[str] = None
 
 
 class SmartHomeResponse(BaseModel):
@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import Optional
 
 
 class SensorData(BaseModel):
@@ -8,3 +9,14 @@ class SensorData(BaseModel):
     ventilador: bool
     persianas: bool
     bulbs: bool
+
+
+class SensorHistoryResponse(BaseModel):
+    start: float
+    end: float
+    bucket_seconds: float
+    timestamps: list[float]
+    count: list[int]
+    min: dict[str, list[Optional[float]]]
+    max: dict[str, list[Optional[float]]]
+    mean: dict[str, list[Optional[float]]]
@@ -1,5 +1,14 @@
 from pydantic import BaseModel
+from typing import Optional
+
+
+class TranscriptionSegment(BaseModel):
+    start: float
+    end: float
+    text: str
 
 
 class TranscriptionResponse(BaseModel):
     text: str
+    segments: list[TranscriptionSegment] = []
+    tier: Optional[str] = None
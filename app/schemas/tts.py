@@ -1,5 +1,9 @@
 from pydantic import BaseModel
+from typing import Optional
 
 
 class TTSRequest(BaseModel):
     text: str
+    format: Optional[str] = None
+    sample_rate: Optional[int] = None
+    bits: Optional[int] = None
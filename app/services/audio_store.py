@@ -0,0 +1,147 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+import threading
+import time
+import uuid
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class StoredAudio:
+    def __init__(self, audio_id: str, data: Optional[bytes], path: Optional[Path],
+                 size: int, media_type: str, expires_at: float):
+        self.id = audio_id
+        self.data = data
+        self.path = path
+        self.size = size
+        self.media_type = media_type
+        self.expires_at = expires_at
+
+    def read(self, start: int = 0, end: Optional[int] = None) -> bytes:
+        end = self.size if end is None else end
+        if self.data is not None:
+            return self.data[start:end]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+
+class AudioStore:
+    def __init__(self, max_bytes: int, ttl: float, spill_dir: Optional[str] = None,
+                 spill_threshold: int = 4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.spill_threshold = spill_threshold
+        self.entries: OrderedDict[str, StoredAudio] = OrderedDict()
+        self.memory_bytes = 0
+        self.spilled_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {"ttl": 0, "budget": 0}
+
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+
+    def put(self, data: bytes, media_type: str = "audio/wav", suffix: str = ".wav",
+            audio_id: Optional[str] = None) -> str:
+        audio_id = audio_id or f"{uuid.uuid4()}{suffix}"
+        with self.lock:
+            if audio_id in self.entries:
+                return audio_id
+
+        expires_at = time.time() + self.ttl
+        if self.spill_dir is not None and len(data) >= self.spill_threshold:
+            # A file of its own, so a concurrent put of the same id never
+            # overwrites the one a live entry is serving.
+            path = self.spill_dir / uuid.uuid4().hex
+            path.write_bytes(data)
+            entry = StoredAudio(audio_id, None, path, len(data), media_type, expires_at)
+        else:
+            entry = StoredAudio(audio_id, data, None, len(data), media_type, expires_at)
+
+        with self.lock:
+            if audio_id in self.entries:
+                if entry.path is not None:
+                    entry.path.unlink(missing_ok=True)
+                return audio_id
+            self.entries[audio_id] = entry
+            if entry.data is not None:
+                self.memory_bytes += entry.size
+            else:
+                self.spilled_bytes += entry.size
+            self.evict()
+
+        return audio_id
+
+    def get(self, audio_id: str) -> Optional[StoredAudio]:
+        with self.lock:
+            self.evict()
+            entry = self.entries.get(audio_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    def release(self, entry: StoredAudio):
+        if entry.data is not None:
+            self.memory_bytes -= entry.size
+        else:
+            self.spilled_bytes -= entry.size
+            entry.path.unlink(missing_ok=True)
+
+    def evict(self):
+        now = time.time()
+        while self.entries:
+            audio_id, entry = next(iter(self.entries.items()))
+            if entry.expires_at > now:
+                break
+            del self.entries[audio_id]
+            self.release(entry)
+            self.evictions["ttl"] += 1
+
+        while self.memory_bytes > self.max_bytes:
+            audio_id = next(
+                (key for key, entry in self.entries.items() if entry.data is not None), None)
+            if audio_id is None:
+                break
+            self.release(self.entries.pop(audio_id))
+            self.evictions["budget"] += 1
+
+    def clear(self):
+        with self.lock:
+            for entry in self.entries.values():
+                self.release(entry)
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "memory_bytes": self.memory_bytes,
+                "max_bytes": self.max_bytes,
+                "spilled_bytes": self.spilled_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": dict(self.evictions),
+            }
+
+
+audio_store = AudioStore(
+    settings.AUDIO_STORE_BYTES,
+    settings.AUDIO_STORE_TTL,
+    settings.AUDIO_STORE_SPILL_DIR,
+    settings.AUDIO_STORE_SPILL_BYTES
+)
+
+metrics.gauge(
+    "audio_store_bytes", "Bytes held by the audio result store", ("tier",),
+    callback=lambda: [({"tier": "memory"}, audio_store.memory_bytes),
+                      ({"tier": "disk"}, audio_store.spilled_bytes)])
+metrics.counter(
+    "audio_store_evictions_total", "Audio results evicted from the store", ("reason",),
+    callback=lambda: [({"reason": reason}, count)
+                      for reason, count in audio_store.evictions.items()])
@@ -0,0 +1,169 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+
+class ConversationSession:
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.turns: list[str] = []
+        self.state = None
+        self.state_bytes = 0
+        self.last_used = time.time()
+
+    @property
+    def history(self) -> str:
+        return "".join(self.turns)
+
+
+class ConversationStore:
+    def __init__(self, max_turns: int, ttl: float, max_bytes: int, max_sessions: int,
+                 spill_dir: Optional[str] = None):
+        self.max_turns = max_turns
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.sessions: OrderedDict[str, ConversationSession] = OrderedDict()
+        self.state_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.spilled = 0
+        self.restored = 0
+
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+
+    def spill_path(self, session_id: str) -> Path:
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:32]
+        return self.spill_dir / f"{digest}.session"
+
+    def get(self, session_id: Optional[str]) -> Optional[ConversationSession]:
+        if not session_id:
+            return None
+
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.read_spill(session_id)
+                if session is not None:
+                    self.sessions[session_id] = session
+                    self.state_bytes += session.state_bytes
+
+            if session is not None and session.last_used + self.ttl <= time.time():
+                self.drop(session)
+                self.expired += 1
+                session = None
+
+            if session is None:
+                self.misses += 1
+                session = ConversationSession(session_id)
+                self.sessions[session_id] = session
+            else:
+                self.hits += 1
+            session.last_used = time.time()
+            self.sessions.move_to_end(session_id)
+            self.evict()
+            return session
+
+    def read_spill(self, session_id: str) -> Optional[ConversationSession]:
+        if self.spill_dir is None:
+            return None
+        path = self.spill_path(session_id)
+        try:
+            with open(path, "rb") as f:
+                session = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠ Could not restore conversation {session_id}: {e}")
+            session = None
+        path.unlink(missing_ok=True)
+
+        if session is not None:
+            self.restored += 1
+        return session
+
+    def write_spill(self, session: ConversationSession):
+        path = self.spill_path(session.session_id)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(session, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.spilled += 1
+
+    def add_turn(self, session: ConversationSession, turn: str):
+        with self.lock:
+            session.turns.append(turn)
+            if len(session.turns) > self.max_turns:
+                # Drop half the window at once: any change to the oldest turns
+                # invalidates the cached KV state, so do it rarely.
+                del session.turns[:len(session.turns) - self.max_turns // 2]
+                self.clear_state(session)
+            session.last_used = time.time()
+
+    def save_state(self, session: ConversationSession, state, size: int):
+        with self.lock:
+            self.clear_state(session)
+            if self.sessions.get(session.session_id) is not session or size > self.max_bytes:
+                return
+            session.state = state
+            session.state_bytes = size
+            self.state_bytes += size
+            self.evict()
+
+    def clear_state(self, session: ConversationSession):
+        if self.sessions.get(session.session_id) is session:
+            self.state_bytes -= session.state_bytes
+        session.state = None
+        session.state_bytes = 0
+
+    def drop(self, session: ConversationSession):
+        if self.sessions.get(session.session_id) is session:
+            del self.sessions[session.session_id]
+            self.state_bytes -= session.state_bytes
+
+    def evict(self):
+        while len(self.sessions) > self.max_sessions or self.state_bytes > self.max_bytes:
+            session = next(iter(self.sessions.values()))
+            if len(self.sessions) <= self.max_sessions and session.state is None:
+                session = next((s for s in self.sessions.values() if s.state is not None), None)
+                if session is None:
+                    break
+
+            self.evictions += 1
+            if self.spill_dir is not None:
+                self.drop(session)
+                try:
+                    self.write_spill(session)
+                except OSError as e:
+                    print(f"⚠ Could not spill conversation {session.session_id}: {e}")
+            elif len(self.sessions) > self.max_sessions:
+                self.drop(session)
+            else:
+                self.clear_state(session)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "sessions": len(self.sessions),
+                "with_state": sum(1 for s in self.sessions.values() if s.state is not None),
+                "state_bytes": self.state_bytes,
+                "max_bytes": self.max_bytes,
+                "max_sessions": self.max_sessions,
+                "max_turns": self.max_turns,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "spilled": self.spilled,
+                "restored": self.restored,
+            }
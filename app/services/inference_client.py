@@ -0,0 +1,206 @@
+from contextlib import contextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Connection
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Optional
+import pickle
+import threading
+import time
+import numpy as np
+from app.core.config import settings
+from app.services.whisper_service import prepare_audio
+
+SHARED_MIN_BYTES = 64 * 1024
+STATUS_POLL_SECONDS = 1.0
+
+
+class SharedArray:
+    def __init__(self, name: str, shape: tuple, dtype: str):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+
+def share_arrays(args: tuple) -> tuple[tuple, list[SharedMemory]]:
+    shared = []
+    segments = []
+    for arg in args:
+        if isinstance(arg, np.ndarray) and arg.nbytes >= SHARED_MIN_BYTES:
+            segment = SharedMemory(create=True, size=arg.nbytes)
+            np.ndarray(arg.shape, arg.dtype, buffer=segment.buf)[...] = arg
+            segments.append(segment)
+            arg = SharedArray(segment.name, arg.shape, arg.dtype.str)
+        shared.append(arg)
+    return tuple(shared), segments
+
+
+def attach_arrays(args: tuple) -> tuple[tuple, list[SharedMemory]]:
+    attached = []
+    segments = []
+    for arg in args:
+        if isinstance(arg, SharedArray):
+            segment = SharedMemory(name=arg.name)
+            # The client owns the segment; keep this process's tracker from unlinking it.
+            resource_tracker.unregister(segment._name, "shared_memory")
+            segments.append(segment)
+            arg = np.ndarray(arg.shape, np.dtype(arg.dtype), buffer=segment.buf)
+        attached.append(arg)
+    return tuple(attached), segments
+
+
+def release_segments(segments: list[SharedMemory], unlink: bool = False):
+    for segment in segments:
+        try:
+            segment.close()
+        except BufferError:
+            pass
+        if unlink:
+            segment.unlink()
+
+
+def authkey_path(address: str) -> Path:
+    return Path(address).with_name(Path(address).name + ".key")
+
+
+def load_authkey(address: str) -> bytes:
+    if settings.INFERENCE_SERVER_AUTHKEY:
+        return settings.INFERENCE_SERVER_AUTHKEY.encode("utf-8")
+    return authkey_path(address).read_bytes()
+
+
+def portable_error(error: Exception) -> Exception:
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+class InferenceClient:
+    def __init__(self, address: str):
+        self.address = address
+        self.idle: list[Connection] = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        with self.lock:
+            conn = self.idle.pop() if self.idle else None
+        if conn is None:
+            conn = Client(self.address, family="AF_UNIX", authkey=load_authkey(self.address))
+
+        try:
+            yield conn
+        except BaseException:
+            conn.close()
+            raise
+
+        with self.lock:
+            self.idle.append(conn)
+
+    def call(self, model: str, method: str, *args, emit: Optional[Callable] = None, **kwargs):
+        args, segments = share_arrays(args)
+        try:
+            with self.connection() as conn:
+                conn.send(("call", model, method, args, kwargs, emit is not None))
+                while True:
+                    kind, *payload = conn.recv()
+                    if kind != "event":
+                        break
+                    emit(*payload)
+        finally:
+            release_segments(segments, unlink=True)
+
+        if kind == "error":
+            raise payload[0]
+        return payload[0]
+
+    def status(self) -> dict:
+        with self.connection() as conn:
+            conn.send(("status",))
+            return conn.recv()[1]
+
+    def wait_ready(self, model: str):
+        waiting_for = None
+        while True:
+            try:
+                status = self.status().get(model, "unknown")
+            except (OSError, EOFError):
+                status = "unreachable"
+
+            if status == "ready":
+                return
+            if status == "failed":
+                raise RuntimeError(f"Model '{model}' failed to load on the inference server")
+            if status != waiting_for:
+                print(f"⏳ Waiting for '{model}' on inference server {self.address} ({status})")
+                waiting_for = status
+            time.sleep(STATUS_POLL_SECONDS)
+
+    def close(self):
+        with self.lock:
+            for conn in self.idle:
+                conn.close()
+            self.idle.clear()
+
+
+class RemoteModel:
+    name = ""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+        client.wait_ready(self.name)
+
+    def remote(self, method: str, *args, **kwargs):
+        return self.client.call(self.name, method, *args, **kwargs)
+
+    def stats(self) -> dict:
+        try:
+            return {"remote": self.client.address, **self.remote("stats")}
+        except (OSError, EOFError) as e:
+            return {"remote": self.client.address, "error": str(e)}
+
+    def close(self):
+        self.client.close()
+
+
+class RemoteLLMService(RemoteModel):
+    name = "llm"
+
+    def generate_smart_home_response(self, context: dict) -> dict:
+        return self.remote("generate_smart_home_response", context)
+
+    def generate_smart_home_stream(self, context: dict, emit=None) -> dict:
+        return self.remote("generate_smart_home_stream", context, emit=emit)
+
+    def prefill(self, context: dict) -> int:
+        return self.remote("prefill", context)
+
+    def record_turn(self, context: dict, result: dict):
+        return self.remote("record_turn", context, result)
+
+
+class RemoteWhisperService(RemoteModel):
+    name = "whisper"
+
+    def transcribe_pcm(self, audio: np.ndarray) -> dict:
+        return self.remote("transcribe_pcm", audio)
+
+    def transcribe_partial(self, audio: np.ndarray) -> dict:
+        return self.remote("transcribe_partial", audio)
+
+    def transcribe_audio(self, data: bytes, filename: Optional[str] = None) -> dict:
+        return self.transcribe_pcm(prepare_audio(data, filename))
+
+
+class RemoteVoice(RemoteModel):
+    name = "tts"
+
+    def __init__(self, client: InferenceClient):
+        super().__init__(client)
+        self.config = SimpleNamespace(sample_rate=self.remote("sample_rate"))
+
+    def synthesize(self, text: str):
+        yield SimpleNamespace(audio_int16_bytes=self.remote("synthesize_pcm", text))
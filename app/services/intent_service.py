@@ -0,0 +1,218 @@
+from typing import Optional
+import re
+import threading
+import time
+import unicodedata
+from app.core.config import settings
+
+
+ACTIONS = {
+    "on": re.compile(r"^(prend\w*|enciend\w*|encend\w*|activ\w*)$"),
+    "off": re.compile(r"^(apag\w*|desactiv\w*)$"),
+    "open": re.compile(r"^(abr\w*|sub\w*)$"),
+    "close": re.compile(r"^(cierr\w*|cerr\w*|baj\w*)$"),
+}
+
+DEVICES = {
+    "bulbs": re.compile(r"^(luz|luces|focos?|lamparas?|bombillas?|bombillos?)$"),
+    "persianas": re.compile(r"^(persianas?|cortinas?)$"),
+    "ventilador": re.compile(r"^(ventiladore?s?)$"),
+}
+
+ALL_DEVICES = re.compile(r"^(todo|todos|todas)$")
+
+DEVICE_ACTIONS = {
+    "bulbs": {"on": True, "off": False},
+    "ventilador": {"on": True, "off": False},
+    "persianas": {"open": True, "close": False},
+}
+
+FILLER_WORDS = {
+    "el", "la", "los", "las", "lo", "del", "de", "al", "a", "un", "una",
+    "por", "favor", "porfa", "porfavor", "ahora", "ya", "mismo", "aula",
+    "salon", "clase", "me", "nos", "puedes", "podrias", "quiero", "que",
+    "alexa", "oye", "hey", "hola", "gracias", "tambien", "toda", "todas",
+}
+
+UNSAFE_WORDS = re.compile(
+    r"\b(no|nunca|si|cuando|despues|luego|minutos?|segundos?|horas?|mientras)\b")
+
+SPLIT_CLAUSES = re.compile(r"\s*(?:,|\by\b|\be\b)\s*")
+
+STATE_LABELS = {
+    "bulbs": {True: "on", False: "off"},
+    "ventilador": {True: "on", False: "off"},
+    "persianas": {True: "open", False: "close"},
+}
+
+PHRASES = {
+    ("bulbs", True): ("encendiendo las luces", "las luces ya están encendidas"),
+    ("bulbs", False): ("apagando las luces", "las luces ya están apagadas"),
+    ("persianas", True): ("abriendo las persianas", "las persianas ya están abiertas"),
+    ("persianas", False): ("cerrando las persianas", "las persianas ya están cerradas"),
+    ("ventilador", True): ("encendiendo el ventilador", "el ventilador ya está encendido"),
+    ("ventilador", False): ("apagando el ventilador", "el ventilador ya está apagado"),
+}
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^\w\s,?¿]", " ", text).strip()
+
+
+def match_clause(words: list[str]) -> Optional[tuple]:
+    actions = [name for word in words for name, pattern in ACTIONS.items()
+               if pattern.match(word)]
+    devices = [name for word in words for name, pattern in DEVICES.items()
+               if pattern.match(word)]
+    explained = sum(
+        1 for word in words
+        if word in FILLER_WORDS or ALL_DEVICES.match(word)
+        or any(p.match(word) for p in ACTIONS.values())
+        or any(p.match(word) for p in DEVICES.values()))
+
+    if len(set(actions)) != 1:
+        return None
+
+    action = actions[0]
+    if not devices and any(ALL_DEVICES.match(word) for word in words):
+        devices = [device for device, supported in DEVICE_ACTIONS.items()
+                   if action in supported]
+    if not devices:
+        return None
+    changes = {}
+    for device in devices:
+        if action not in DEVICE_ACTIONS[device]:
+            return None
+        changes[device] = DEVICE_ACTIONS[device][action]
+
+    return changes, explained
+
+
+def common_answers() -> list[str]:
+    answers = []
+    for action, already in PHRASES.values():
+        answers.append(f"Listo, {action}.")
+        answers.append(f"{already[0].upper()}{already[1:]}.")
+    return answers
+
+
+class IntentService:
+    def __init__(self, enabled: bool, min_confidence: float):
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self.lock = threading.Lock()
+        self.intents: dict[str, dict] = {}
+        self.requests = 0
+        self.misses = 0
+
+    def classify(self, text: str) -> Optional[tuple]:
+        normalized = normalize(text)
+        if not normalized or "?" in normalized or "¿" in normalized:
+            return None
+        if UNSAFE_WORDS.search(normalized):
+            return None
+
+        changes = {}
+        explained = 0
+        total = 0
+        for clause in SPLIT_CLAUSES.split(normalized):
+            words = clause.split()
+            if not words:
+                continue
+            if all(word in FILLER_WORDS for word in words):
+                explained += len(words)
+                total += len(words)
+                continue
+            matched = match_clause(words)
+            if matched is None:
+                return None
+            clause_changes, clause_explained = matched
+            for device, state in clause_changes.items():
+                if changes.get(device, state) != state:
+                    return None
+                changes[device] = state
+            explained += clause_explained
+            total += len(words)
+
+        if not changes:
+            return None
+
+        confidence = explained / total
+        if confidence < self.min_confidence:
+            return None
+        return changes, confidence
+
+    def match(self, context: dict) -> Optional[dict]:
+        if not self.enabled:
+            return None
+
+        start = time.perf_counter()
+        classified = self.classify(context['request'])
+        elapsed = time.perf_counter() - start
+
+        with self.lock:
+            self.requests += 1
+            if classified is None:
+                self.misses += 1
+                return None
+
+        changes, confidence = classified
+        intent = ",".join(
+            f"{device}:{STATE_LABELS[device][state]}" for device, state in sorted(changes.items()))
+
+        result = {
+            "ventilador": context['ventilador'],
+            "persianas": context['persianas'],
+            "bulbs": context['bulbs'],
+        }
+        actions = []
+        unchanged = []
+        for device, state in changes.items():
+            action, already = PHRASES[(device, state)]
+            if result[device] == state:
+                unchanged.append(already)
+            else:
+                actions.append(action)
+            result[device] = state
+
+        sentences = []
+        if actions:
+            sentences.append(f"Listo, {' y '.join(actions)}.")
+        if unchanged:
+            sentence = " y ".join(unchanged)
+            sentences.append(f"{sentence[0].upper()}{sentence[1:]}.")
+        result["answer"] = " ".join(sentences)
+
+        with self.lock:
+            stats = self.intents.setdefault(
+                intent, {"hits": 0, "match_seconds": 0.0})
+            stats["hits"] += 1
+            stats["match_seconds"] += elapsed
+
+        print(f"⚡ Intent fast path: {intent} (confidence {confidence:.2f})")
+        return result
+
+    def stats(self, llm_seconds: Optional[float] = None) -> dict:
+        with self.lock:
+            hits = self.requests - self.misses
+            return {
+                "requests": self.requests,
+                "hits": hits,
+                "misses": self.misses,
+                "hit_rate": hits / self.requests if self.requests else None,
+                "intents": {
+                    intent: {
+                        "hits": data["hits"],
+                        "avg_match_ms": data["match_seconds"] / data["hits"] * 1000,
+                        "estimated_seconds_saved":
+                            data["hits"] * llm_seconds if llm_seconds else None,
+                    }
+                    for intent, data in self.intents.items()
+                },
+            }
+
+
+intent_service = IntentService(
+    settings.INTENT_FAST_PATH, settings.INTENT_MIN_CONFIDENCE)
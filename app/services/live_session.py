@@ -0,0 +1,86 @@
+from typing import Optional
+import re
+import numpy as np
+from app.core.config import settings
+from app.core.audio import SAMPLE_RATE, Endpointer, StreamDecoder
+
+
+def comparable(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def stable_prefix(previous: list[str], current: list[str]) -> list[str]:
+    common = 0
+    for before, now in zip(previous, current):
+        if comparable(before) != comparable(now):
+            break
+        common += 1
+    return current[:common]
+
+
+class LiveSession:
+    def __init__(self, context: dict, encoding: str = "pcm16", sample_rate: int = SAMPLE_RATE):
+        self.context = context
+        self.decoder = StreamDecoder(encoding, sample_rate)
+        self.endpointer = Endpointer(
+            threshold_db=settings.VAD_THRESHOLD_DB,
+            margin_db=settings.VAD_MARGIN_DB,
+            min_speech_ms=settings.VAD_MIN_SPEECH_MS,
+            end_silence_ms=settings.LIVE_END_SILENCE_MS
+        )
+        self.chunks: list[np.ndarray] = []
+        self.samples = 0
+        self.partial_at = 0
+        self.partials = 0
+        self.words: list[str] = []
+        self.stable = ""
+        self.prefilled = ""
+        self.end_reason: Optional[str] = None
+
+    @property
+    def ended(self) -> bool:
+        return self.end_reason is not None
+
+    def feed(self, data: bytes) -> bool:
+        audio = self.decoder.decode(data)
+        self.chunks.append(audio)
+        self.samples += len(audio)
+
+        if self.endpointer.push(audio):
+            self.end_reason = "silence"
+        elif self.samples >= settings.LIVE_MAX_SECONDS * SAMPLE_RATE:
+            self.end_reason = "max_duration"
+        return self.ended
+
+    def finish(self, reason: str = "stream_end"):
+        if self.end_reason is None:
+            self.end_reason = reason
+
+    def speech_audio(self) -> np.ndarray:
+        if len(self.chunks) > 1:
+            self.chunks = [np.concatenate(self.chunks)]
+        endpointer = self.endpointer
+        if not self.chunks or not endpointer.started:
+            return np.zeros(0, dtype=np.float32)
+
+        audio = self.chunks[0]
+        padding = SAMPLE_RATE * settings.VAD_PADDING_MS // 1000
+        first = max(endpointer.speech_start - padding, 0)
+        last = endpointer.speech_end + padding if endpointer.ended else len(audio)
+        return audio[first:last]
+
+    def partial_due(self) -> bool:
+        interval = SAMPLE_RATE * settings.LIVE_PARTIAL_INTERVAL_MS // 1000
+        return self.endpointer.started and self.samples - self.partial_at >= interval
+
+    def update_partial(self, text: str) -> str:
+        words = text.split()
+        self.stable = " ".join(stable_prefix(self.words, words))
+        self.words = words
+        self.partials += 1
+        return self.stable
+
+    def prefill_due(self) -> bool:
+        if not settings.LIVE_EARLY_PREFILL or self.prefilled.startswith(self.stable):
+            return False
+        return len(self.stable.split()) >= settings.LIVE_PREFILL_MIN_WORDS
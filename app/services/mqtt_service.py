@@ -2,16 +2,19 @@ import paho.mqtt.client as mqtt
 import json
 from typing import Optional
 import threading
-import queue
+from app.services.sensor_hub import sensor_hub
+from app.services.sensor_history import SensorHistory, sensor_history
+from app.core.metrics import mqtt_messages
 
 
 class MQTTService:
-    def __init__(self, broker: str = "localhost", port: int = 1883):
+    def __init__(self, broker: str = "localhost", port: int = 1883,
+                 history: Optional[SensorHistory] = None):
         self.broker = broker
         self.port = port
+        self.history = history or sensor_history
         self.client = None
         self.latest_data = None
-        self.data_queue = queue.Queue()
         self.lock = threading.Lock()
         self.connected = False
 
@@ -28,10 +31,13 @@ class MQTTService:
     def on_message(self, client, userdata, msg):
         try:
             data = json.loads(msg.payload.decode())
+            mqtt_messages.inc()
 
             with self.lock:
                 self.latest_data = data
-                self.data_queue.put(data)
+
+            self.history.append(data)
+            sensor_hub.publish_threadsafe(data)
         except Exception as e:
             print(f"✗ Error processing message: {e}")
 
@@ -68,11 +74,5 @@ class MQTTService:
         with self.lock:
             return self.latest_data
 
-    def get_data_blocking(self, timeout=30):
-        try:
-            return self.data_queue.get(timeout=timeout)
-        except queue.Empty:
-            return None
-
 
 mqtt_service = MQTTService()
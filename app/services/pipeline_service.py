@@ -1,35 +1,255 @@
-from pathlib import Path
-from app.services.whisper_service import WhisperService
-from app.services.tts_service import TTSService
-from app.services.llm_service import LLMService
+from app.core.model_registry import model_registry
+from app.core.inference_executor import InferenceQueueFull, inference_executor
+from app.core.audio import SAMPLE_RATE
+from app.services.intent_service import intent_service
+from app.services.llm_service import record_turn
+from app.services.response_cache import response_cache
+from app.services.tts_service import synthesize_pcm, synthesize_wav
+from app.services.whisper_service import NoSpeechDetected, transcribe
+from app.services.live_session import LiveSession
+from app.services.audio_store import audio_store
+from app.core.metrics import span, stage_seconds
 from fastapi import UploadFile
-import uuid
+import asyncio
+import re
+import time
+
+
+SENTENCE_END = re.compile(r"(.+?[.!?…]+)\s+", re.S)
+
+
+class SentenceSplitter:
+    def __init__(self, min_length: int = 12):
+        self.buffer = ""
+        self.min_length = min_length
+
+    def push(self, text: str) -> list[str]:
+        self.buffer += text
+        sentences = []
+        position = 0
+        pending = ""
+
+        for match in SENTENCE_END.finditer(self.buffer):
+            pending += match.group(1) if not pending else " " + match.group(1)
+            position = match.end()
+            if len(pending) >= self.min_length:
+                sentences.append(pending.strip())
+                pending = ""
+
+        if position:
+            self.buffer = (pending + " " if pending else "") + self.buffer[position:]
+        return sentences
+
+    def flush(self) -> list[str]:
+        sentence = self.buffer.strip()
+        self.buffer = ""
+        return [sentence] if sentence else []
+
+
+def log_prefill_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"⚠ Early prefill failed: {future.exception()}")
 
 
 class PipelineService:
     def __init__(self):
-        self.whisper_service = WhisperService()
-        self.tts_service = TTSService()
-        self.llm_service = LLMService()
-        self.temp_dir = Path("temp_audio")
-        self.temp_dir.mkdir(exist_ok=True)
+        self.tts = model_registry.handle("tts")
+        self.llm = model_registry.handle("llm")
 
     async def process_audio(self, file: UploadFile, context: dict) -> dict:
-        transcription = await self.whisper_service.transcribe_audio(file)
+        with span("pipeline_total"):
+            with span("upload"):
+                data = await file.read()
+            with span("pipeline_stt"):
+                transcription = await transcribe(data, file.filename)
 
-        context['request'] = transcription
+            context['request'] = transcription['text']
 
-        llm_response = self.llm_service.generate_smart_home_response(context)
+            with span("pipeline_llm"):
+                llm_response = intent_service.match(context) or response_cache.get(context)
+                if llm_response is None:
+                    llm_response = await inference_executor.run(
+                        "llm", self.llm.call, "generate_smart_home_response", context)
+                    response_cache.put(context, llm_response)
+                else:
+                    await record_turn(context, llm_response)
 
-        output_file = self.temp_dir / f"{uuid.uuid4()}.wav"
-        self.tts_service.text_to_speech(
-            llm_response['answer'], str(output_file))
+            with span("pipeline_tts"):
+                audio_id = await asyncio.to_thread(
+                    audio_store.put, await synthesize_wav(llm_response['answer']))
 
         return {
-            "transcription": transcription,
+            "transcription": transcription['text'],
+            "transcription_tier": transcription.get('tier'),
             "answer": llm_response['answer'],
-            "audio_file": str(output_file),
+            "audio_id": audio_id,
             "ventilador": llm_response['ventilador'],
             "persianas": llm_response['persianas'],
             "bulbs": llm_response['bulbs']
         }
+
+    async def stream_audio(self, data: bytes, filename: str, context: dict):
+        start = time.perf_counter()
+        with span("pipeline_stt"):
+            transcription = await transcribe(data, filename)
+
+        async for event in self.stream_reply(transcription, context, start):
+            yield event
+
+    async def stream_live(self, frames, session: LiveSession):
+        whisper = model_registry.handle("whisper")
+        partials = []
+        partial_task = None
+
+        async for frame in frames:
+            ended = session.feed(frame)
+            while partials:
+                yield partials.pop(0)
+            if ended:
+                break
+            if (partial_task is None or partial_task.done()) and session.partial_due() and \
+                    inference_executor.pool("stt").pending == 0:
+                partial_task = asyncio.ensure_future(self.live_partial(session, partials))
+        session.finish()
+
+        if partial_task is not None:
+            await partial_task
+        for event in partials:
+            yield event
+
+        start = time.perf_counter()
+        yield {
+            "type": "end_of_speech",
+            "reason": session.end_reason,
+            "duration": round(session.samples / SAMPLE_RATE, 3),
+            "partials": session.partials
+        }
+
+        audio = session.speech_audio()
+        if len(audio) == 0:
+            raise NoSpeechDetected("No se detectó voz en el audio")
+        with span("pipeline_stt"):
+            transcription = await inference_executor.run(
+                "stt", whisper.call, "transcribe_pcm", audio)
+
+        async for event in self.stream_reply(
+                transcription, session.context, start, "live_time_to_first_audio"):
+            yield event
+
+    async def live_partial(self, session: LiveSession, partials: list):
+        whisper = model_registry.handle("whisper")
+        session.partial_at = session.samples
+        try:
+            transcription = await inference_executor.run(
+                "stt", whisper.call, "transcribe_partial", session.speech_audio())
+        except InferenceQueueFull:
+            return
+
+        stable = session.update_partial(transcription['text'])
+        partials.append({"type": "partial", "text": transcription['text'], "stable": stable})
+
+        if session.prefill_due() and self.llm.ready and \
+                inference_executor.pool("llm").pending == 0:
+            session.prefilled = stable
+            try:
+                future = inference_executor.pool("llm").submit(
+                    self.llm.call, "prefill", {**session.context, "request": stable})
+            except InferenceQueueFull:
+                return
+            future.add_done_callback(log_prefill_error)
+
+    async def stream_reply(self, transcription: dict, context: dict, start: float,
+                           stage: str = "time_to_first_audio"):
+        context['request'] = transcription['text']
+
+        yield {
+            "type": "transcription",
+            "text": transcription['text'],
+            "tier": transcription.get('tier')
+        }
+        yield {
+            "type": "audio_format",
+            "sample_rate": self.tts.get().sample_rate,
+            "channels": 1,
+            "sample_width": 2
+        }
+
+        first_audio = True
+        async for event in self.stream_response(context):
+            if first_audio and isinstance(event, bytes):
+                first_audio = False
+                stage_seconds.observe(time.perf_counter() - start, stage=stage)
+            yield event
+
+    async def stream_response(self, context: dict):
+        loop = asyncio.get_running_loop()
+        llm_events = asyncio.Queue()
+        sentences = asyncio.Queue()
+        output = asyncio.Queue()
+        result = {}
+
+        def emit(kind: str, payload):
+            loop.call_soon_threadsafe(llm_events.put_nowait, (kind, payload))
+
+        async def generate():
+            fast_response = intent_service.match(context) or response_cache.get(context)
+            if fast_response is not None:
+                await record_turn(context, fast_response)
+                await output.put({
+                    "type": "state",
+                    **{key: value for key, value in fast_response.items() if key != "answer"}
+                })
+                await sentences.put(fast_response['answer'])
+                await sentences.put(None)
+                result.update(fast_response)
+                return
+
+            llm_task = asyncio.ensure_future(inference_executor.run(
+                "llm", self.llm.call, "generate_smart_home_stream", context, emit))
+            llm_task.add_done_callback(
+                lambda task: llm_events.put_nowait(("done", None)))
+
+            splitter = SentenceSplitter()
+            while True:
+                kind, payload = await llm_events.get()
+                if kind == "state":
+                    await output.put({"type": "state", **payload})
+                elif kind == "answer":
+                    for sentence in splitter.push(payload):
+                        await sentences.put(sentence)
+                elif kind == "done":
+                    break
+
+            for sentence in splitter.flush():
+                await sentences.put(sentence)
+            await sentences.put(None)
+            result.update(await llm_task)
+            response_cache.put(context, result)
+
+        async def speak():
+            while (sentence := await sentences.get()) is not None:
+                pcm = await synthesize_pcm(sentence)
+                await output.put({"type": "sentence", "text": sentence})
+                await output.put(pcm)
+
+        async def run():
+            tasks = [asyncio.ensure_future(generate()),
+                     asyncio.ensure_future(speak())]
+            try:
+                await asyncio.gather(*tasks)
+                await output.put({"type": "result", **result})
+            except Exception as e:
+                await output.put(e)
+            finally:
+                for task in tasks:
+                    task.cancel()
+            await output.put(None)
+
+        runner = asyncio.ensure_future(run())
+        try:
+            while (item := await output.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            runner.cancel()
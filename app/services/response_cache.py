@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+import math
+import re
+import threading
+import time
+import pytz
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.intent_service import ACTIONS, FILLER_WORDS, normalize
+from app.services.llm_service import ERROR_ANSWER, STATE_FIELDS
+
+FIELD_WORDS = {
+    "temperature": re.compile(r"\b(temperatura|calor|frio|grados|clima|caliente|fresco)"),
+    "humidity": re.compile(r"\b(humedad|humedo|seco)"),
+    "light_quantity": re.compile(r"\b(luz|luminosidad|oscur|claridad|iluminad)"),
+    "ventilador": re.compile(r"\b(ventilador)"),
+    "persianas": re.compile(r"\b(persiana|cortina)"),
+    "bulbs": re.compile(r"\b(luz|luces|foco|lampara|bombill)"),
+}
+
+TIME_WORDS = re.compile(r"\b(hora|fecha|dia|hoy|manana|tarde|noche|semana|mes|ano)\b")
+
+
+class ResponseCache:
+    def __init__(self, enabled: bool, max_entries: int, ttl: float, buckets: dict):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.buckets = buckets
+        self.entries: OrderedDict[str, tuple[float, tuple, str]] = OrderedDict()
+        self.keys_by_request: dict[tuple, str] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def request_key(text: str) -> Optional[str]:
+        words = [word for word in re.sub(r"[?¿,]", " ", normalize(text)).split()
+                 if word not in FILLER_WORDS]
+        if not words:
+            return None
+        if any(pattern.match(word) for word in words for pattern in ACTIONS.values()):
+            return None
+        return " ".join(words)
+
+    def key(self, request_key: str, context: dict) -> str:
+        fields = [field for field, pattern in FIELD_WORDS.items()
+                  if pattern.search(request_key)] or list(FIELD_WORDS)
+
+        parts = [request_key]
+        if context.get('session_id'):
+            # Conversations can change what a follow-up means; answers stay per session.
+            parts.insert(0, f"session={context['session_id']}")
+        for field in fields:
+            if field in self.buckets:
+                parts.append(f"{field}={math.floor(context[field] / self.buckets[field])}")
+            else:
+                parts.append(f"{field}={bool(context[field])}")
+        if TIME_WORDS.search(request_key):
+            now = datetime.now(pytz.timezone('America/Lima'))
+            parts.append(now.strftime("%Y-%m-%d %H:%M"))
+        return "|".join(parts)
+
+    def drop(self, key: str):
+        _, index, _ = self.entries.pop(key)
+        if self.keys_by_request.get(index) == key:
+            del self.keys_by_request[index]
+
+    def get(self, context: dict) -> Optional[dict]:
+        if not self.enabled:
+            return None
+
+        request_key = self.request_key(context['request'])
+        if request_key is None:
+            with self.lock:
+                self.bypassed += 1
+            return None
+
+        key = self.key(request_key, context)
+        index = (context.get('session_id'), request_key)
+        with self.lock:
+            previous = self.keys_by_request.get(index)
+            if previous is not None and previous != key:
+                self.drop(previous)
+                self.invalidations += 1
+
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                self.drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+
+        print(f"⚡ Response cache hit: {request_key}")
+        return {"answer": entry[2], **{field: context[field] for field in STATE_FIELDS}}
+
+    def put(self, context: dict, result: dict):
+        if not self.enabled or result['answer'] == ERROR_ANSWER:
+            return
+        if any(result[field] != context[field] for field in STATE_FIELDS):
+            return
+
+        request_key = self.request_key(context['request'])
+        if request_key is None:
+            return
+
+        key = self.key(request_key, context)
+        index = (context.get('session_id'), request_key)
+        with self.lock:
+            previous = self.keys_by_request.get(index)
+            if previous is not None and previous != key:
+                self.drop(previous)
+                self.invalidations += 1
+            self.entries[key] = (time.time() + self.ttl, index, result['answer'])
+            self.entries.move_to_end(key)
+            self.keys_by_request[index] = key
+            while len(self.entries) > self.max_entries:
+                self.drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_ratio": self.hits / lookups if lookups else None,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+response_cache = ResponseCache(
+    settings.RESPONSE_CACHE,
+    settings.RESPONSE_CACHE_SIZE,
+    settings.RESPONSE_CACHE_TTL,
+    {
+        "temperature": settings.RESPONSE_CACHE_TEMPERATURE_BUCKET,
+        "humidity": settings.RESPONSE_CACHE_HUMIDITY_BUCKET,
+        "light_quantity": settings.RESPONSE_CACHE_LIGHT_BUCKET,
+    }
+)
+
+metrics.counter(
+    "response_cache_lookups_total", "LLM response cache lookups by result", ("result",),
+    callback=lambda: [
+        ({"result": "hit"}, response_cache.hits),
+        ({"result": "miss"}, response_cache.misses),
+        ({"result": "bypass"}, response_cache.bypassed),
+    ])
+metrics.counter(
+    "response_cache_invalidations_total", "Cached answers dropped because sensor state changed",
+    callback=lambda: [({}, response_cache.invalidations)])
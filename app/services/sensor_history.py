@@ -0,0 +1,139 @@
+from pathlib import Path
+from typing import Optional
+import threading
+import time
+import numpy as np
+from app.core.config import settings
+from app.schemas.sensors import SensorData
+
+FIELDS = tuple(SensorData.model_fields)
+
+
+class SensorHistory:
+    def __init__(self, capacity: int, snapshot_path: Optional[str] = None,
+                 snapshot_interval: float = 60):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = np.full((capacity, len(FIELDS)), np.nan, dtype=np.float32)
+        self.head = 0
+        self.count = 0
+        self.lock = threading.Lock()
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.snapshot_interval = snapshot_interval
+        self.last_snapshot = time.time()
+
+        if self.snapshot_path is not None and self.snapshot_path.exists():
+            self.restore()
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + self.values.nbytes
+
+    def append(self, data: dict, timestamp: Optional[float] = None):
+        row = [float(data[field]) if data.get(field) is not None else np.nan
+               for field in FIELDS]
+
+        with self.lock:
+            self.timestamps[self.head] = timestamp or time.time()
+            self.values[self.head] = row
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+        if self.snapshot_path is not None and \
+                time.time() - self.last_snapshot >= self.snapshot_interval:
+            self.snapshot()
+
+    def ordered(self) -> tuple:
+        with self.lock:
+            if self.count < self.capacity:
+                return self.timestamps[:self.count].copy(), self.values[:self.count].copy()
+            order = np.r_[self.head:self.capacity, 0:self.head]
+            return self.timestamps[order], self.values[order]
+
+    def query(self, seconds: float, points: int) -> dict:
+        end = time.time()
+        start = end - seconds
+        bucket_seconds = seconds / points
+
+        timestamps, values = self.ordered()
+        first = np.searchsorted(timestamps, start)
+        timestamps, values = timestamps[first:], values[first:]
+
+        result = {
+            "start": start,
+            "end": end,
+            "bucket_seconds": bucket_seconds,
+            "timestamps": [],
+            "count": [],
+            "min": {field: [] for field in FIELDS},
+            "max": {field: [] for field in FIELDS},
+            "mean": {field: [] for field in FIELDS},
+        }
+        if len(timestamps) == 0:
+            return result
+
+        buckets = np.minimum(
+            ((timestamps - start) / bucket_seconds).astype(np.int64), points - 1)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0), starts, axis=0)
+        counts = np.add.reduceat(valid, starts, axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+        mins = np.fmin.reduceat(values, starts, axis=0)
+        maxs = np.fmax.reduceat(values, starts, axis=0)
+
+        result["timestamps"] = (start + buckets[starts] * bucket_seconds).tolist()
+        result["count"] = np.diff(np.r_[starts, len(timestamps)]).tolist()
+        for i, field in enumerate(FIELDS):
+            result["min"][field] = nan_to_none(mins[:, i])
+            result["max"][field] = nan_to_none(maxs[:, i])
+            result["mean"][field] = nan_to_none(means[:, i])
+        return result
+
+    def snapshot(self):
+        if self.snapshot_path is None:
+            return
+
+        timestamps, values = self.ordered()
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        snapshot = np.lib.format.open_memmap(
+            self.snapshot_path, mode="w+",
+            dtype=[("t", np.float64), ("v", np.float32, (len(FIELDS),))],
+            shape=(len(timestamps),))
+        snapshot["t"] = timestamps
+        snapshot["v"] = values
+        snapshot.flush()
+        del snapshot
+        self.last_snapshot = time.time()
+
+    def restore(self):
+        try:
+            snapshot = np.load(self.snapshot_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not restore sensor history: {e}")
+            return
+
+        if snapshot.dtype.names != ("t", "v") or snapshot["v"].shape[1:] != (len(FIELDS),):
+            print("⚠ Sensor history snapshot has a different layout, ignoring it")
+            return
+
+        rows = snapshot[-self.capacity:]
+        with self.lock:
+            self.count = len(rows)
+            self.timestamps[:self.count] = rows["t"]
+            self.values[:self.count] = rows["v"]
+            self.head = self.count % self.capacity
+        print(f"✓ Restored {self.count} sensor readings from {self.snapshot_path}")
+
+
+def nan_to_none(column: np.ndarray) -> list:
+    return [None if np.isnan(value) else round(float(value), 3) for value in column]
+
+
+sensor_history = SensorHistory(
+    settings.SENSOR_HISTORY_CAPACITY,
+    settings.SENSOR_HISTORY_SNAPSHOT_PATH,
+    settings.SENSOR_HISTORY_SNAPSHOT_INTERVAL
+)
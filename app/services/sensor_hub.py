@@ -0,0 +1,70 @@
+from typing import Optional
+import asyncio
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class Subscription:
+    def __init__(self, maxsize: int):
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def push(self, data: dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(data)
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class SensorHub:
+    def __init__(self, buffer_size: int):
+        self.buffer_size = buffer_size
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.subscribers: set[Subscription] = set()
+        self.published = 0
+        self.dropped = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def publish_threadsafe(self, data: dict):
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.publish, data)
+
+    def publish(self, data: dict):
+        self.published += 1
+        for subscription in self.subscribers:
+            subscription.push(data)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.buffer_size)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+        self.dropped += subscription.dropped
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "dropped": self.dropped + sum(s.dropped for s in self.subscribers),
+        }
+
+
+sensor_hub = SensorHub(settings.SENSOR_STREAM_BUFFER)
+
+metrics.gauge(
+    "sse_clients", "Connected /sensors/stream clients",
+    callback=lambda: [({}, len(sensor_hub.subscribers))])
+metrics.counter(
+    "sse_dropped_messages_total", "Sensor messages dropped by slow SSE clients",
+    callback=lambda: [({}, sensor_hub.stats()["dropped"])])
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+import hashlib
+import json
+import os
+import threading
+
+
+class TTSCache:
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None,
+                 disk_max_chars: int = 120):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_chars = disk_max_chars
+        self.entries: OrderedDict[str, bytes] = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.evictions = 0
+
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(voice: str, text: str, params: dict) -> str:
+        payload = json.dumps(
+            {"voice": voice, "text": text, "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, record: bool = True) -> Optional[bytes]:
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+                if record:
+                    self.hits += 1
+                    self.bytes_served += len(data)
+                return data
+
+        data = self.read_disk(key)
+        with self.lock:
+            if data is None:
+                if record:
+                    self.misses += 1
+                return None
+            if record:
+                self.disk_hits += 1
+                self.bytes_served += len(data)
+
+        self.put_memory(key, data)
+        return data
+
+    def put(self, key: str, data: bytes, text: str = ""):
+        self.put_memory(key, data)
+        if self.disk_dir is not None and len(text) <= self.disk_max_chars:
+            self.write_disk(key, data)
+
+    def put_memory(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+
+            self.entries[key] = data
+            self.size += len(data)
+
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def read_disk(self, key: str) -> Optional[bytes]:
+        if self.disk_dir is None:
+            return None
+        path = self.disk_dir / f"{key}.pcm"
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def write_disk(self, key: str, data: bytes):
+        path = self.disk_dir / f"{key}.pcm"
+        if path.exists():
+            return
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else None,
+                "bytes_served": self.bytes_served,
+                "evictions": self.evictions,
+            }
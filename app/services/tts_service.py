@@ -1,13 +1,106 @@
-from pathlib import Path
+from typing import Optional
 from piper import PiperVoice
-import wave
+from piper.config import PiperConfig
+import asyncio
+import io
+import json
+import onnxruntime
+import numpy as np
+from app.core.config import settings
+from app.core.audio import write_wav
+from app.core.model_registry import model_registry
+from app.core.inference_executor import inference_executor
+from app.core.metrics import metrics, span
+from app.core.thread_budget import thread_budget
+from app.services.tts_cache import TTSCache
+
+tts_cache = TTSCache(
+    settings.TTS_CACHE_BYTES,
+    settings.TTS_CACHE_DIR,
+    settings.TTS_CACHE_DISK_MAX_CHARS
+)
+
+metrics.counter(
+    "tts_cache_lookups_total", "TTS cache lookups by result", ("result",),
+    callback=lambda: [
+        ({"result": "memory_hit"}, tts_cache.hits),
+        ({"result": "disk_hit"}, tts_cache.disk_hits),
+        ({"result": "miss"}, tts_cache.misses),
+    ])
+metrics.counter(
+    "tts_cache_served_bytes_total", "Bytes of audio served from the TTS cache",
+    callback=lambda: [({}, tts_cache.bytes_served)])
+
+
+def load_voice(model_path: str, n_threads: Optional[int] = None) -> PiperVoice:
+    # What PiperVoice.load does, minus its default-threaded session: the
+    # model is read once, straight into a session sized by the thread budget.
+    with open(f"{model_path}.json", "r", encoding="utf-8") as f:
+        config = PiperConfig.from_dict(json.load(f))
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = n_threads or thread_budget.threads_for("tts")
+    options.inter_op_num_threads = 1
+    session = onnxruntime.InferenceSession(
+        model_path, sess_options=options, providers=["CPUExecutionProvider"])
+    return PiperVoice(session=session, config=config)
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    buffer = io.BytesIO()
+    write_wav(buffer, np.frombuffer(pcm, dtype=np.int16), sample_rate)
+    return buffer.getvalue()
 
 
 class TTSService:
-    def __init__(self):
-        self.model_path = "models/es_AR-daniela-high.onnx"
-        self.voice = PiperVoice.load(self.model_path)
+    def __init__(self, voice=None, cache: Optional[TTSCache] = None):
+        self.model_path = settings.TTS_MODEL_PATH
+        self.voice = voice or load_voice(self.model_path)
+        self.cache = cache or tts_cache
+
+    @property
+    def sample_rate(self) -> int:
+        return self.voice.config.sample_rate
+
+    def cache_key(self, text: str, encoding: Optional[dict] = None) -> str:
+        params = {"sample_rate": self.sample_rate, "format": "s16le"}
+        if encoding is not None:
+            params["encoding"] = encoding
+        return self.cache.key(self.model_path, text, params)
+
+    def cached_pcm(self, text: str) -> Optional[bytes]:
+        return self.cache.get(self.cache_key(text))
+
+    def synthesize_pcm(self, text: str) -> bytes:
+        key = self.cache_key(text)
+        pcm = self.cache.get(key, record=False)
+        if pcm is None:
+            with span("tts"):
+                pcm = b"".join(
+                    chunk.audio_int16_bytes for chunk in self.voice.synthesize(text))
+            self.cache.put(key, pcm, text)
+        return pcm
+
+    def synthesize_wav(self, text: str) -> bytes:
+        return pcm_to_wav(self.synthesize_pcm(text), self.sample_rate)
+
+    def warmup(self, phrases: Optional[list[str]] = None):
+        self.prewarm(phrases or ["Hola."])
+
+    def prewarm(self, phrases: list[str]):
+        for phrase in phrases:
+            self.synthesize_pcm(phrase)
+        print(f"✓ TTS cache prewarmed with {len(phrases)} phrases")
+
+
+async def synthesize_pcm(text: str) -> bytes:
+    tts = model_registry.handle("tts")
+    # The lookup can fall through to the disk tier, so it runs off the loop.
+    pcm = await asyncio.to_thread(tts.get().cached_pcm, text)
+    if pcm is None:
+        pcm = await inference_executor.run("tts", tts.call, "synthesize_pcm", text)
+    return pcm
+
 
-    def text_to_speech(self, text: str, output_path: str):
-        with wave.open(output_path, "wb") as wav_file:
-            self.voice.synthesize_wav(text, wav_file)
+async def synthesize_wav(text: str) -> bytes:
+    return pcm_to_wav(await synthesize_pcm(text), model_registry.get("tts").sample_rate)
@@ -1,43 +1,183 @@
-import subprocess
 from pathlib import Path
-from fastapi import UploadFile
-import shutil
+from typing import Optional
+import asyncio
+import threading
+import uuid
+import numpy as np
+from app.core.config import settings
+from app.core.audio import SAMPLE_RATE, decode_audio, save_debug_capture, trim_silence
+from app.core.model_registry import model_registry
+from app.core.inference_executor import inference_executor
+from app.core.metrics import metrics, span
+from app.core.thread_budget import thread_budget
 from app.modelos.whisper_detector import WhisperDetector
+from app.modelos.faster_whisper_detector import FasterWhisperDetector
 
 
-def convert_to_wav(input_audio: Path, output_wav: Path):
-    subprocess.run([
-        "ffmpeg",
-        "-i", str(input_audio),
-        "-ar", "16000",
-        "-ac", "1",
-        "-c:a", "pcm_s16le",
-        str(output_wav)
-    ], check=True)
+class NoSpeechDetected(Exception):
+    pass
 
 
-class WhisperService:
+class VADStats:
     def __init__(self):
-        self.detector = WhisperDetector(
-            whisper_cli_path=Path("whisper.cpp/build/bin/whisper-cli"),
-            model_path=Path("whisper.cpp/models/ggml-medium.bin")
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.skipped = 0
+        self.input_seconds = 0.0
+        self.trimmed_seconds = 0.0
+
+    def record(self, input_samples: int, output_samples: int):
+        with self.lock:
+            self.requests += 1
+            self.input_seconds += input_samples / SAMPLE_RATE
+            self.trimmed_seconds += (input_samples - output_samples) / SAMPLE_RATE
+            if output_samples == 0:
+                self.skipped += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "skipped": self.skipped,
+                "input_seconds": round(self.input_seconds, 3),
+                "trimmed_seconds": round(self.trimmed_seconds, 3),
+            }
+
+
+vad_stats = VADStats()
+
+metrics.counter(
+    "stt_vad_requests_total", "Uploads run through silence trimming by result", ("result",),
+    callback=lambda: [
+        ({"result": "kept"}, vad_stats.requests - vad_stats.skipped),
+        ({"result": "skipped"}, vad_stats.skipped),
+    ])
+metrics.counter(
+    "stt_vad_input_seconds_total", "Seconds of uploaded audio before silence trimming",
+    callback=lambda: [({}, vad_stats.input_seconds)])
+metrics.counter(
+    "stt_vad_trimmed_seconds_total", "Seconds of silence trimmed before transcription",
+    callback=lambda: [({}, vad_stats.trimmed_seconds)])
+
+
+def build_detector(model_size: str):
+    if settings.WHISPER_BACKEND == "whisper-cpp":
+        return WhisperDetector(
+            whisper_cli_path=Path(settings.WHISPER_CPP_CLI_PATH),
+            model_path=Path(settings.WHISPER_CPP_MODEL_PATH),
+            threads=thread_budget.threads_for("whisper"),
+            language=settings.WHISPER_LANGUAGE
         )
-        self.temp_dir = Path("temp_audio")
-        self.temp_dir.mkdir(exist_ok=True, parents=True)
 
-    async def transcribe_audio(self, file: UploadFile) -> str:
-        orig_file = self.temp_dir / file.filename
+    return FasterWhisperDetector(
+        model_size=model_size,
+        device=settings.WHISPER_DEVICE,
+        compute_type=settings.WHISPER_COMPUTE_TYPE,
+        cpu_threads=thread_budget.threads_for("whisper"),
+        language=settings.WHISPER_LANGUAGE,
+        beam_size=settings.WHISPER_BEAM_SIZE,
+        download_root=settings.WHISPER_MODEL_DIR
+    )
+
+
+def prepare_audio(data: bytes, filename: Optional[str] = None) -> np.ndarray:
+    if settings.AUDIO_DEBUG_CAPTURE:
+        save_debug_capture(
+            Path(settings.TEMP_AUDIO_DIR), f"{uuid.uuid4()}_{filename or 'audio'}", data)
+
+    with span("decode"):
+        audio = decode_audio(data)
+    if not settings.VAD_ENABLED:
+        return audio
+
+    with span("vad"):
+        speech = trim_silence(
+            audio,
+            threshold_db=settings.VAD_THRESHOLD_DB,
+            margin_db=settings.VAD_MARGIN_DB,
+            padding_ms=settings.VAD_PADDING_MS,
+            min_speech_ms=settings.VAD_MIN_SPEECH_MS
+        )
+    vad_stats.record(len(audio), len(speech))
+
+    if len(speech) == 0:
+        raise NoSpeechDetected("No se detectó voz en el audio")
+    return speech
+
 
-        with open(orig_file, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+class WhisperService:
+    def __init__(self, detector=None, fast_detector=None):
+        self.detector = detector or build_detector(settings.WHISPER_MODEL_SIZE)
+        self.fast_detector = fast_detector
+        self.tier_counts = {"fast": 0, "escalated": 0}
+
+        if detector is None and settings.WHISPER_TIERED and settings.WHISPER_BACKEND != "whisper-cpp":
+            self.fast_detector = build_detector(settings.WHISPER_FAST_MODEL_SIZE)
+
+    def is_confident(self, transcription: dict) -> bool:
+        if transcription["avg_logprob"] is None:
+            return False
+        return transcription["avg_logprob"] >= settings.WHISPER_ESCALATE_AVG_LOGPROB and \
+            transcription["no_speech_prob"] <= settings.WHISPER_ESCALATE_NO_SPEECH_PROB
+
+    def transcribe_pcm(self, audio: np.ndarray) -> dict:
+        with span("stt"):
+            return self.transcribe_tiered(audio)
 
-        if orig_file.suffix.lower() == ".opus":
-            wav_file = self.temp_dir / (orig_file.stem + ".wav")
-            convert_to_wav(orig_file, wav_file)
-            transcription = self.detector.getCleanTranscription(str(wav_file))
-            wav_file.unlink()
-        else:
-            transcription = self.detector.getCleanTranscription(str(orig_file))
+    def transcribe_partial(self, audio: np.ndarray) -> dict:
+        with span("stt_partial"):
+            return (self.fast_detector or self.detector).transcribe(audio)
 
-        orig_file.unlink()
+    def transcribe_tiered(self, audio: np.ndarray) -> dict:
+        if self.fast_detector is None:
+            transcription = self.detector.transcribe(audio)
+            transcription["tier"] = settings.WHISPER_MODEL_SIZE
+            return transcription
+
+        transcription = self.fast_detector.transcribe(audio)
+        if self.is_confident(transcription):
+            self.tier_counts["fast"] += 1
+            transcription["tier"] = settings.WHISPER_FAST_MODEL_SIZE
+            return transcription
+
+        print(
+            f"STT escalating to {settings.WHISPER_MODEL_SIZE}: "
+            f"avg_logprob={transcription['avg_logprob']}, no_speech_prob={transcription['no_speech_prob']}")
+        self.tier_counts["escalated"] += 1
+        transcription = self.detector.transcribe(audio)
+        transcription["tier"] = settings.WHISPER_MODEL_SIZE
         return transcription
+
+    def warmup(self):
+        audio = np.random.default_rng(0).normal(0, 0.01, SAMPLE_RATE).astype(np.float32)
+        for detector in (self.fast_detector, self.detector):
+            if detector is not None:
+                detector.transcribe(audio)
+
+    def stats(self) -> dict:
+        return {
+            "tiered": self.fast_detector is not None,
+            "tiers": dict(self.tier_counts),
+        }
+
+    def transcribe_audio(self, data: bytes, filename: Optional[str] = None) -> dict:
+        return self.transcribe_pcm(prepare_audio(data, filename))
+
+
+def tier_counts() -> list:
+    handle = model_registry.handles.get("whisper")
+    if handle is None or not handle.loaded:
+        return []
+    return [({"tier": tier}, count) for tier, count in handle.get().stats()["tiers"].items()]
+
+
+metrics.counter(
+    "stt_tier_requests_total", "Tiered transcriptions by the model that answered", ("tier",),
+    callback=tier_counts)
+
+
+async def transcribe(data: bytes, filename: Optional[str] = None) -> dict:
+    whisper = model_registry.handle("whisper")
+    whisper.require()
+    audio = await asyncio.to_thread(prepare_audio, data, filename)
+    return await inference_executor.run("stt", whisper.call, "transcribe_pcm", audio)
@@ -0,0 +1,86 @@
+import time
+from locust import HttpUser, task, between
+from benchmarks.stubs import sine_wav
+
+AUDIO = sine_wav(seconds=3.0)
+
+DEVICE_FORM = {
+    "temperature": "22.5",
+    "light_quantity": "40",
+    "humidity": "55",
+    "ventilador": "false",
+    "persianas": "true",
+    "bulbs": "true",
+}
+
+
+class VoiceUser(HttpUser):
+    wait_time = between(0.5, 2)
+
+    @task(3)
+    def pipeline(self):
+        with self.client.post(
+            "/api/v1/pipeline",
+            files={"file": ("audio.wav", AUDIO, "audio/wav")},
+            data=DEVICE_FORM,
+            name="/pipeline",
+            catch_response=True,
+        ) as response:
+            if response.status_code != 200:
+                response.failure(f"status {response.status_code}")
+                return
+            audio_filename = response.json()["audio_filename"]
+
+        self.client.get(f"/api/v1/audio/{audio_filename}", name="/audio/[id]")
+
+    @task(3)
+    def smart_home(self):
+        self.client.post(
+            "/api/v1/smart-home",
+            json={"request": "qué temperatura hace en el aula"},
+            name="/smart-home",
+        )
+
+    @task(2)
+    def smart_home_command(self):
+        self.client.post(
+            "/api/v1/smart-home",
+            json={"request": "prende las luces"},
+            name="/smart-home (fast path)",
+        )
+
+    @task(2)
+    def tts(self):
+        self.client.post(
+            "/api/v1/tts",
+            json={"text": "La temperatura actual es de veintidós grados."},
+            name="/tts",
+        )
+
+
+class DashboardUser(HttpUser):
+    wait_time = between(1, 3)
+
+    @task
+    def sensor_stream(self):
+        start = time.perf_counter()
+        with self.client.get(
+            "/api/v1/sensors/stream", stream=True, name="/sensors/stream",
+            timeout=40, catch_response=True,
+        ) as response:
+            for line in response.iter_lines():
+                if line.startswith(b"data:"):
+                    break
+            response.success()
+        self.environment.events.request.fire(
+            request_type="SSE",
+            name="/sensors/stream first event",
+            response_time=(time.perf_counter() - start) * 1000,
+            response_length=0,
+            exception=None,
+            context={},
+        )
+
+    @task(3)
+    def latest(self):
+        self.client.get("/api/v1/sensors/latest", name="/sensors/latest")
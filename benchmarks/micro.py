@@ -0,0 +1,183 @@
+from pathlib import Path
+from types import SimpleNamespace
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from benchmarks.stubs import FakeLlama, FakeWhisperDetector, SineVoice, fake_whisper_cli, sine_wav
+
+CONTEXT = {
+    "request": "qué temperatura hace en el aula",
+    "temperature": 22.5,
+    "light_quantity": 40.0,
+    "humidity": 55.0,
+    "ventilador": False,
+    "persianas": True,
+    "bulbs": True,
+}
+
+# Fake prefill speed; real CPU prefill of the 12B model is roughly 100x slower.
+PREFILL_SECONDS_PER_TOKEN = 0.0002
+
+SENSOR_PAYLOAD = json.dumps({
+    "temperatura": 22.5, "humedad": 55.0, "luz": 40.0,
+    "ventilador": False, "persianas": True, "bulbs": True,
+}).encode()
+
+
+def measure(name: str, fn, iterations: int, warmup: int = 3) -> dict:
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        "name": name,
+        "iterations": iterations,
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(int(len(timings) * 0.95), len(timings) - 1)],
+    }
+
+
+def stt_benchmarks(iterations: int) -> list[dict]:
+    from app.core.audio import decode_audio, trim_silence
+    from app.modelos.whisper_detector import WhisperDetector
+    from app.services.whisper_service import WhisperService, prepare_audio
+
+    wav = sine_wav(seconds=3.0)
+    audio = decode_audio(wav)
+    service = WhisperService(detector=FakeWhisperDetector())
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The whisper.cpp backend's own cost: a temp WAV, a process and output parsing.
+        cli = WhisperDetector(fake_whisper_cli(directory), Path(directory) / "model.bin")
+        return [
+            measure("audio.decode_audio", lambda: decode_audio(wav), iterations),
+            measure("audio.trim_silence", lambda: trim_silence(audio), iterations),
+            measure("whisper.prepare_audio", lambda: prepare_audio(wav), iterations),
+            measure("whisper.transcribe_audio", lambda: service.transcribe_audio(wav), iterations),
+            measure("whisper_cpp.transcribe", lambda: cli.transcribe(audio),
+                    max(iterations // 10, 10)),
+        ]
+
+
+def llm_benchmarks(iterations: int) -> list[dict]:
+    from app.services.llm_service import LLMService
+    from app.services.intent_service import intent_service
+
+    service = LLMService(llm=FakeLlama())
+    command = dict(CONTEXT, request="prende las luces y cierra las persianas")
+
+    # Prefill cost with the context holding another prompt, as after a turn
+    # from a different conversation; only the prefix cache avoids the full prefill.
+    cached = LLMService(llm=FakeLlama(prefill_seconds_per_token=PREFILL_SECONDS_PER_TOKEN))
+    uncached = LLMService(llm=FakeLlama(prefill_seconds_per_token=PREFILL_SECONDS_PER_TOKEN))
+    uncached.prefix_state = None
+
+    def cold_generate(llm_service):
+        llm_service.llm.reset()
+        llm_service.generate_smart_home_response(dict(CONTEXT))
+
+    prefill_iterations = max(iterations // 10, 10)
+    return [
+        measure("llm.build_prompt", lambda: service.build_prompt(CONTEXT), iterations),
+        measure("llm.generate_smart_home_response",
+                lambda: service.generate_smart_home_response(dict(CONTEXT)), iterations),
+        measure("llm.cold_prefill (prefix cache)",
+                lambda: cold_generate(cached), prefill_iterations),
+        measure("llm.cold_prefill (no prefix cache)",
+                lambda: cold_generate(uncached), prefill_iterations),
+        measure("intent.match", lambda: intent_service.match(command), iterations),
+    ]
+
+
+def tts_benchmarks(iterations: int) -> list[dict]:
+    from app.core.config import settings
+    from app.services.tts_cache import TTSCache
+    from app.services.tts_service import TTSService
+
+    # A private memory-only cache, so runs never touch TTS_CACHE_DIR.
+    service = TTSService(voice=SineVoice(), cache=TTSCache(settings.TTS_CACHE_BYTES))
+    counter = iter(range(10 ** 9))
+
+    return [
+        measure("tts.synthesize_pcm (miss)",
+                lambda: service.synthesize_pcm(f"Respuesta número {next(counter)}."), iterations),
+        measure("tts.synthesize_pcm (hit)",
+                lambda: service.synthesize_pcm("Listo, encendiendo las luces."), iterations),
+        measure("tts.synthesize_wav (hit)",
+                lambda: service.synthesize_wav("Listo, encendiendo las luces."), iterations),
+    ]
+
+
+def mqtt_benchmarks(iterations: int) -> list[dict]:
+    from app.core.config import settings
+    from app.services.mqtt_service import MQTTService
+    from app.services.sensor_history import SensorHistory
+
+    # No snapshot path, so synthetic readings never reach SENSOR_HISTORY_SNAPSHOT_PATH.
+    history = SensorHistory(settings.SENSOR_HISTORY_CAPACITY)
+    service = MQTTService(history=history)
+    message = SimpleNamespace(payload=SENSOR_PAYLOAD, topic="data")
+
+    return [
+        measure("mqtt.on_message", lambda: service.on_message(None, None, message), iterations),
+        measure("sensor_history.query",
+                lambda: history.query(3600, 60), max(iterations // 10, 10)),
+    ]
+
+
+SUITES = {
+    "stt": stt_benchmarks,
+    "llm": llm_benchmarks,
+    "tts": tts_benchmarks,
+    "mqtt": mqtt_benchmarks,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage microbenchmarks with stub models")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--suite", choices=list(SUITES), action="append")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown over the baseline mean")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.suite or SUITES:
+        results.extend(SUITES[name](args.iterations))
+
+    print(f"{'benchmark':40} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for result in results:
+        print(f"{result['name']:40} {result['mean_ms']:10.3f} "
+              f"{result['p50_ms']:10.3f} {result['p95_ms']:10.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {r["name"]: r for r in json.load(f)}
+        regressions = [
+            r["name"] for r in results
+            if r["name"] in baseline
+            and r["mean_ms"] > baseline[r["name"]]["mean_ms"] * (1 + args.tolerance)
+        ]
+        if regressions:
+            print(f"✗ Regressions over {args.tolerance:.0%}: {', '.join(regressions)}")
+            raise SystemExit(1)
+        print("✓ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
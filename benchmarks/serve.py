@@ -0,0 +1,31 @@
+import argparse
+import uvicorn
+from benchmarks.stubs import register_stub_models
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with stub model backends")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--llm-delay", type=float, default=0.0,
+                        help="seconds per generated token")
+    parser.add_argument("--stt-factor", type=float, default=0.0,
+                        help="seconds of STT work per second of audio")
+    parser.add_argument("--tts-factor", type=float, default=0.0,
+                        help="seconds of TTS work per second of audio")
+    args = parser.parse_args()
+
+    register_stub_models(args.llm_delay, args.stt_factor, args.tts_factor)
+
+    from app.main import app
+    from app.services.mqtt_service import mqtt_service
+
+    mqtt_service.latest_data = {
+        "temperatura": 22.5, "humedad": 55.0, "luz": 40.0,
+        "ventilador": False, "persianas": True, "bulbs": True,
+    }
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
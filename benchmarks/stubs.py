@@ -0,0 +1,163 @@
+from pathlib import Path
+from types import SimpleNamespace
+import json
+import re
+import sys
+import time
+import numpy as np
+from app.core.model_registry import model_registry
+
+CANNED_RESPONSE = {
+    "ventilador": False,
+    "persianas": True,
+    "bulbs": True,
+    "answer": "La temperatura actual es de veintidós grados. Todo está en orden en el aula."
+}
+
+REQUEST_LINE = re.compile(r"SOLICITUD DEL USUARIO: (.*)")
+
+
+class FakeLlama:
+    def __init__(self, response: dict = None, prefill_seconds_per_token: float = 0.0,
+                 decode_seconds_per_token: float = 0.0, n_ctx: int = 4096,
+                 state_bytes_per_token: int = 128 * 1024):
+        self.response = response or CANNED_RESPONSE
+        self.prefill_seconds_per_token = prefill_seconds_per_token
+        self.decode_seconds_per_token = decode_seconds_per_token
+        self.state_bytes_per_token = state_bytes_per_token
+        self.input_ids = np.zeros(n_ctx, dtype=np.intc)
+        self.n_tokens = 0
+
+    def tokenize(self, text: bytes, add_bos: bool = True, special: bool = False) -> list[int]:
+        tokens = [hash(piece) % 32000 for piece in re.findall(rb"\S+|\s+", text)]
+        return [2, *tokens] if add_bos else tokens
+
+    def reset(self):
+        self.n_tokens = 0
+
+    def eval(self, tokens: list[int]):
+        time.sleep(self.prefill_seconds_per_token * len(tokens))
+        self.input_ids[self.n_tokens:self.n_tokens + len(tokens)] = tokens
+        self.n_tokens += len(tokens)
+
+    def save_state(self):
+        return SimpleNamespace(
+            input_ids=self.input_ids.copy(),
+            n_tokens=self.n_tokens,
+            llama_state_size=self.n_tokens * self.state_bytes_per_token
+        )
+
+    def load_state(self, state):
+        self.input_ids, self.n_tokens = state.input_ids.copy(), state.n_tokens
+
+    def prefill(self, prompt: str):
+        tokens = self.tokenize(prompt.encode("utf-8"))
+        common = 0
+        for cached, token in zip(self.input_ids[:self.n_tokens], tokens):
+            if cached != token:
+                break
+            common += 1
+        self.n_tokens = common
+        self.eval(tokens[common:])
+
+    def __call__(self, prompt: str, stream: bool = False, max_tokens: int = 256, **kwargs):
+        self.prefill(prompt)
+        text = json.dumps(self.response, ensure_ascii=False)
+        pieces = re.findall(r".{1,4}", text, re.S)[:max_tokens]
+
+        if not stream:
+            time.sleep(self.decode_seconds_per_token * len(pieces))
+            return {"choices": [{"text": "".join(pieces)}]}
+        return self.stream(pieces)
+
+    def stream(self, pieces: list[str]):
+        for piece in pieces:
+            time.sleep(self.decode_seconds_per_token)
+            yield {"choices": [{"text": piece}]}
+
+
+class FakeWhisperDetector:
+    def __init__(self, text: str = "qué temperatura hace en el aula", seconds_per_audio_second: float = 0.0):
+        self.text = text
+        self.seconds_per_audio_second = seconds_per_audio_second
+
+    def transcribe(self, audio) -> dict:
+        duration = len(audio) / 16000
+        time.sleep(self.seconds_per_audio_second * duration)
+        return {
+            "text": self.text,
+            "segments": [{"start": 0.0, "end": round(duration, 3), "text": self.text}],
+            "duration": duration,
+            "avg_logprob": -0.2,
+            "no_speech_prob": 0.01,
+        }
+
+    def getCleanTranscription(self, audio) -> str:
+        return self.transcribe(audio)["text"]
+
+
+def fake_whisper_cli(directory: Path, text: str = "qué temperatura hace en el aula") -> Path:
+    # Prints a transcript in whisper.cpp's whisper-cli format, for WhisperDetector.
+    path = Path(directory) / "whisper-cli"
+    path.write_text(
+        f"#!{sys.executable}\n"
+        f"print('[00:00:00.000 --> 00:00:01.500]   {text}')\n")
+    path.chmod(0o755)
+    return path
+
+
+class SineVoice:
+    def __init__(self, sample_rate: int = 22050, seconds_per_char: float = 0.06,
+                 frequency: float = 220.0, realtime_factor: float = 0.0):
+        self.config = SimpleNamespace(sample_rate=sample_rate)
+        self.seconds_per_char = seconds_per_char
+        self.frequency = frequency
+        self.realtime_factor = realtime_factor
+
+    def synthesize(self, text: str):
+        duration = max(len(text), 1) * self.seconds_per_char
+        time.sleep(duration * self.realtime_factor)
+        samples = np.arange(int(duration * self.config.sample_rate))
+        wave = 0.3 * np.sin(2 * np.pi * self.frequency * samples / self.config.sample_rate)
+        yield SimpleNamespace(
+            sample_rate=self.config.sample_rate,
+            audio_int16_bytes=(wave * 32767).astype(np.int16).tobytes()
+        )
+
+    def synthesize_wav(self, text: str, wav_file):
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(self.config.sample_rate)
+        for chunk in self.synthesize(text):
+            wav_file.writeframes(chunk.audio_int16_bytes)
+
+
+def sine_wav(seconds: float = 2.0, sample_rate: int = 16000, speech_start: float = 0.5,
+             speech_end: float = 1.5) -> bytes:
+    from app.core.audio import write_wav
+    import io
+
+    rng = np.random.default_rng(0)
+    audio = rng.normal(0, 0.002, int(seconds * sample_rate)).astype(np.float32)
+    start, end = int(speech_start * sample_rate), int(speech_end * sample_rate)
+    t = np.arange(end - start) / sample_rate
+    audio[start:end] += 0.3 * np.sin(2 * np.pi * 220 * t)
+
+    buffer = io.BytesIO()
+    write_wav(buffer, audio, sample_rate)
+    return buffer.getvalue()
+
+
+def register_stub_models(llm_delay: float = 0.0, stt_factor: float = 0.0,
+                         tts_factor: float = 0.0):
+    from app.services.llm_service import LLMService
+    from app.services.whisper_service import WhisperService
+    from app.services.tts_service import TTSService
+    from app.main import warm_tts
+
+    model_registry.register("llm", lambda: LLMService(
+        llm=FakeLlama(decode_seconds_per_token=llm_delay)))
+    model_registry.register("whisper", lambda: WhisperService(
+        detector=FakeWhisperDetector(seconds_per_audio_second=stt_factor)))
+    model_registry.register("tts", lambda: TTSService(
+        voice=SineVoice(realtime_factor=tts_factor)), warmup=warm_tts)
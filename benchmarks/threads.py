@@ -0,0 +1,216 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+import argparse
+import os
+import statistics
+import threading
+import time
+import numpy as np
+from app.core.thread_budget import ENGINES, ThreadBudget
+from benchmarks.micro import CONTEXT
+
+# Work per engine call, in synchronized steps. Each step is split across the
+# engine's threads and ends on a barrier, like llama.cpp / CTranslate2 /
+# onnxruntime do per layer, which is what makes oversubscription expensive.
+ENGINE_STEPS = {"whisper": 120, "llm": 360, "tts": 60}
+STEP_MATMULS = 24
+LLM_TOKEN_STEPS = 12
+MATRIX = 96
+SPEECH = "Enciende el ventilador y cierra las persianas, por favor."
+REPLY = "Listo, encendí el ventilador y cerré las persianas del aula."
+
+
+class EmulatedEngine:
+    def __init__(self, name: str):
+        self.name = name
+        self.matrix = np.random.default_rng(0).random((MATRIX, MATRIX), dtype=np.float32)
+
+    def work(self, matmuls: int):
+        for _ in range(matmuls):
+            self.matrix @ self.matrix
+
+    def run_steps(self, steps: int, n_threads: int):
+        barrier = threading.Barrier(n_threads)
+        share = max(STEP_MATMULS // n_threads, 1)
+
+        def worker():
+            for _ in range(steps):
+                self.work(share)
+                barrier.wait()
+
+        threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run(self, threads: Callable[[], int]):
+        steps = ENGINE_STEPS[self.name]
+        chunk = LLM_TOKEN_STEPS if self.name == "llm" else steps
+        for _ in range(0, steps, chunk):
+            self.run_steps(chunk, threads())
+
+
+class WhisperEngine:
+    name = "whisper"
+
+    def __init__(self, n_threads: int, audio: np.ndarray):
+        from app.core.config import settings
+        from app.modelos.faster_whisper_detector import FasterWhisperDetector
+        self.audio = audio
+        self.detector = FasterWhisperDetector(
+            model_size=settings.WHISPER_FAST_MODEL_SIZE if settings.WHISPER_TIERED
+            else settings.WHISPER_MODEL_SIZE,
+            device=settings.WHISPER_DEVICE,
+            compute_type=settings.WHISPER_COMPUTE_TYPE,
+            cpu_threads=n_threads,
+            language=settings.WHISPER_LANGUAGE,
+            beam_size=settings.WHISPER_BEAM_SIZE,
+            download_root=settings.WHISPER_MODEL_DIR
+        )
+
+    def run(self, threads: Callable[[], int]):
+        self.detector.transcribe(self.audio)
+
+
+class LLMEngine:
+    name = "llm"
+
+    def __init__(self, n_threads: int):
+        from llama_cpp import Llama
+        from app.core.config import settings
+        from app.services.llm_service import LLMService
+        self.llm = Llama(
+            model_path=settings.LLM_MODEL_PATH,
+            n_ctx=4096,
+            n_threads=n_threads,
+            n_threads_batch=n_threads,
+            n_batch=512,
+            verbose=False,
+        )
+        self.prompt = LLMService(llm=self.llm).build_prompt(CONTEXT)
+        self.max_tokens = settings.LLM_MAX_TOKENS
+
+    def run(self, threads: Callable[[], int]):
+        from app.services.llm_service import set_n_threads
+        set_n_threads(self.llm, threads())
+        self.llm.reset()
+        for _ in self.llm(self.prompt, max_tokens=self.max_tokens, temperature=0.0, stream=True):
+            set_n_threads(self.llm, threads())
+
+
+class TTSEngine:
+    name = "tts"
+
+    def __init__(self, n_threads: int):
+        from app.core.config import settings
+        from app.services.tts_service import load_voice
+        self.voice = load_voice(settings.TTS_MODEL_PATH, n_threads)
+
+    def synthesize(self, text: str) -> bytes:
+        return b"".join(chunk.audio_int16_bytes for chunk in self.voice.synthesize(text))
+
+    def run(self, threads: Callable[[], int]):
+        self.synthesize(REPLY)
+
+    def speech(self) -> np.ndarray:
+        from app.core.audio import decode_audio
+        from app.services.tts_service import pcm_to_wav
+        return decode_audio(pcm_to_wav(self.synthesize(SPEECH), self.voice.config.sample_rate))
+
+
+def load_engines(real: bool, threads: dict) -> dict:
+    if not real:
+        return {name: EmulatedEngine(name) for name in ENGINE_STEPS}
+
+    # Whisper and Piper fix their thread pools at load time, so each mode
+    # loads its own copies; only llama.cpp can be resized between tokens.
+    tts = TTSEngine(threads["tts"])
+    return {
+        "whisper": WhisperEngine(threads["whisper"], tts.speech()),
+        "llm": LLMEngine(threads["llm"]),
+        "tts": tts,
+    }
+
+
+def naive_threads(cpus: int) -> dict:
+    return {"whisper": min(8, cpus), "llm": max(cpus - 2, 1), "tts": cpus}
+
+
+def run_stage(engine, lock: threading.Lock, budget: ThreadBudget, cpus: int):
+    # One request per engine at a time, like ModelHandle.acquire.
+    with lock:
+        if budget is None:
+            engine.run(lambda: naive_threads(cpus)[engine.name])
+            return
+
+        with budget.stage(engine.name):
+            engine.run(lambda: budget.threads_for(engine.name))
+
+
+def run_load(engines: dict, budget: ThreadBudget, cpus: int, clients: int, jobs: int) -> dict:
+    engine_locks = {name: threading.Lock() for name in engines}
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(jobs):
+            start = time.perf_counter()
+            for name in ("whisper", "llm", "tts"):
+                run_stage(engines[name], engine_locks[name], budget, cpus)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for future in [pool.submit(client) for _ in range(clients)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "jobs_per_second": len(latencies) / elapsed,
+        "p50_s": latencies[len(latencies) // 2],
+        "p95_s": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+        "mean_s": statistics.fmean(latencies),
+    }
+
+
+def main():
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    parser = argparse.ArgumentParser(
+        description="Concurrent pipeline throughput with and without the thread budget")
+    parser.add_argument("--clients", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=4, help="pipeline runs per client")
+    parser.add_argument("--whisper-threads", type=int, default=max(cpus // 3, 1))
+    parser.add_argument("--tts-threads", type=int, default=2)
+    parser.add_argument("--pin", action="store_true", help="pin engines to CPU sets")
+    parser.add_argument("--real", action="store_true",
+                        help="run the Whisper, Gemma and Piper models from settings "
+                             "instead of emulated engines")
+    args = parser.parse_args()
+
+    budget = ThreadBudget(cpus, args.whisper_threads, args.tts_threads, 2, args.pin)
+    print(f"{cpus} CPUs, {args.clients} concurrent clients x {args.jobs} pipeline runs, "
+          f"{'real' if args.real else 'emulated'} engines")
+    print(f"naive threads: {naive_threads(cpus)}")
+    print(f"budget: {budget.stats()['threads']} (llm shrinks while other stages run)")
+
+    results = {}
+    for mode, mode_budget in (("naive", None), ("budget", budget)):
+        threads = naive_threads(cpus) if mode_budget is None else {
+            engine: mode_budget.threads_for(engine) for engine in ENGINES}
+        engines = load_engines(args.real, threads)
+        results[mode] = run_load(engines, mode_budget, cpus, args.clients, args.jobs)
+        del engines
+
+    print(f"{'mode':10} {'jobs/s':>10} {'mean s':>10} {'p50 s':>10} {'p95 s':>10}")
+    for mode, result in results.items():
+        print(f"{mode:10} {result['jobs_per_second']:10.3f} {result['mean_s']:10.3f} "
+              f"{result['p50_s']:10.3f} {result['p95_s']:10.3f}")
+    speedup = results["budget"]["jobs_per_second"] / results["naive"]["jobs_per_second"]
+    print(f"throughput change: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
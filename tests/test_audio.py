@@ -0,0 +1,58 @@
+import numpy as np
+from app.core.audio import SAMPLE_RATE, trim_silence
+
+
+def voiced(seconds: float, level: float = 0.1, swing_db: float = 6.0) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    harmonics = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 6))
+    envelope = 10 ** (swing_db / 2 * np.sin(2 * np.pi * 3 * t) / 20)
+    return (level * envelope * harmonics).astype(np.float32)
+
+
+def noise(seconds: float, level: float = 1e-4) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return (level * rng.standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32)
+
+
+def test_silence_padded_speech_is_trimmed_to_the_speech():
+    audio = np.concatenate([noise(1.0), voiced(1.0), noise(1.0)])
+
+    speech = trim_silence(audio)
+
+    # One second of speech plus 200 ms of padding on each side, to the frame.
+    assert abs(len(speech) / SAMPLE_RATE - 1.4) < 0.07
+    assert np.abs(speech).max() == np.abs(audio).max()
+
+
+def test_clip_that_is_all_speech_is_kept():
+    audio = voiced(2.0)
+
+    assert len(trim_silence(audio)) / SAMPLE_RATE > 1.9
+
+
+def test_quiet_clip_that_is_all_speech_is_kept():
+    audio = voiced(2.0, level=0.01)
+
+    assert len(trim_silence(audio)) / SAMPLE_RATE > 1.9
+
+
+def test_steady_tone_is_kept():
+    t = np.arange(2 * SAMPLE_RATE) / SAMPLE_RATE
+    audio = (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+    assert len(trim_silence(audio)) == len(audio)
+
+
+def test_pure_silence_is_rejected():
+    assert len(trim_silence(np.zeros(2 * SAMPLE_RATE, dtype=np.float32))) == 0
+    assert len(trim_silence(noise(2.0))) == 0
+
+
+def test_speech_shorter_than_the_minimum_is_rejected():
+    audio = np.concatenate([noise(1.0), voiced(0.15), noise(1.0)])
+
+    assert len(trim_silence(audio, min_speech_ms=250)) == 0
+
+
+def test_clip_shorter_than_a_frame_is_rejected():
+    assert len(trim_silence(voiced(0.01))) == 0
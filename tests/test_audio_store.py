@@ -0,0 +1,34 @@
+from app.services.audio_store import AudioStore
+
+
+def test_put_spills_large_audio_to_disk(tmp_path):
+    store = AudioStore(1024, 60, str(tmp_path), spill_threshold=100)
+
+    small = store.put(b"a" * 10)
+    large = store.put(b"b" * 200)
+
+    assert store.get(small).data == b"a" * 10
+    assert store.get(large).data is None
+    assert store.get(large).read(0, 4) == b"bbbb"
+    assert store.stats()["spilled_bytes"] == 200
+
+
+def test_reputting_an_id_keeps_the_live_entry(tmp_path):
+    store = AudioStore(1024, 60, str(tmp_path), spill_threshold=100)
+    store.put(b"first" * 40, audio_id="reply.wav:mp3")
+
+    store.put(b"other" * 40, audio_id="reply.wav:mp3")
+
+    entry = store.get("reply.wav:mp3")
+    assert entry.read() == b"first" * 40
+    assert len(list(tmp_path.iterdir())) == 1
+    assert store.stats()["spilled_bytes"] == 200
+
+
+def test_expired_entries_release_their_files(tmp_path):
+    store = AudioStore(1024, 0, str(tmp_path), spill_threshold=100)
+    audio_id = store.put(b"x" * 200)
+
+    assert store.get(audio_id) is None
+    assert list(tmp_path.iterdir()) == []
+    assert store.stats()["evictions"]["ttl"] == 1
@@ -0,0 +1,118 @@
+from app.services import conversation_store as conversation_store_module
+from app.services.conversation_store import ConversationStore
+
+
+def store(tmp_path=None, **overrides) -> ConversationStore:
+    options = {"max_turns": 4, "ttl": 900, "max_bytes": 1000, "max_sessions": 3}
+    options.update(overrides)
+    return ConversationStore(spill_dir=str(tmp_path) if tmp_path else None, **options)
+
+
+def test_turns_accumulate_and_the_window_drops_half_at_once():
+    sessions = store()
+    session = sessions.get("aula-1")
+    sessions.save_state(session, "kv", 100)
+
+    for index in range(4):
+        sessions.add_turn(session, f"t{index}|")
+    assert session.history == "t0|t1|t2|t3|"
+    assert session.state == "kv"
+
+    sessions.add_turn(session, "t4|")
+    assert session.turns == ["t3|", "t4|"]
+    assert session.state is None
+    assert sessions.stats()["state_bytes"] == 0
+
+
+def test_missing_session_id_has_no_session():
+    assert store().get(None) is None
+    assert store().get("") is None
+
+
+def test_state_over_the_byte_budget_evicts_the_oldest_state():
+    sessions = store()
+    first, second = sessions.get("aula-1"), sessions.get("aula-2")
+    sessions.save_state(first, "kv-1", 600)
+
+    sessions.save_state(second, "kv-2", 600)
+
+    assert first.state is None and second.state == "kv-2"
+    assert sessions.stats()["state_bytes"] == 600
+    assert sessions.stats()["sessions"] == 2
+
+
+def test_state_larger_than_the_budget_is_not_kept():
+    sessions = store()
+    session = sessions.get("aula-1")
+
+    sessions.save_state(session, "kv", 5000)
+
+    assert session.state is None
+    assert sessions.stats()["state_bytes"] == 0
+
+
+def test_least_recent_session_is_dropped_past_the_limit():
+    sessions = store()
+    for name in ("a", "b", "c"):
+        sessions.get(name)
+    sessions.get("a")
+
+    sessions.get("d")
+
+    assert set(sessions.sessions) == {"a", "c", "d"}
+    assert sessions.stats()["evictions"] == 1
+
+
+def test_expired_session_starts_over(monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(conversation_store_module.time, "time", lambda: now)
+    sessions = store()
+    session = sessions.get("aula-1")
+    sessions.add_turn(session, "t0|")
+    sessions.save_state(session, "kv", 100)
+
+    now += 901
+    fresh = sessions.get("aula-1")
+
+    assert fresh is not session and fresh.history == ""
+    assert sessions.stats()["expired"] == 1
+    assert sessions.stats()["state_bytes"] == 0
+
+
+def test_evicted_sessions_spill_to_disk_and_come_back(tmp_path):
+    sessions = store(tmp_path, max_sessions=1)
+    session = sessions.get("aula-1")
+    sessions.add_turn(session, "t0|")
+    sessions.save_state(session, "kv", 100)
+
+    sessions.get("aula-2")
+    assert len(list(tmp_path.glob("*.session"))) == 1
+    assert sessions.stats()["state_bytes"] == 0
+
+    restored = sessions.get("aula-1")
+    assert restored.history == "t0|" and restored.state == "kv"
+    assert sessions.stats()["state_bytes"] == 100
+    assert sessions.stats()["restored"] == 1
+    # aula-2 took the disk slot; aula-1's file was consumed on restore.
+    assert len(list(tmp_path.glob("*.session"))) == 1
+
+
+def test_state_over_budget_spills_the_whole_session(tmp_path):
+    sessions = store(tmp_path)
+    first, second = sessions.get("aula-1"), sessions.get("aula-2")
+    sessions.save_state(first, "kv-1", 600)
+
+    sessions.save_state(second, "kv-2", 600)
+
+    assert "aula-1" not in sessions.sessions
+    assert sessions.get("aula-1").state == "kv-1"
+
+
+def test_corrupt_spill_file_is_discarded(tmp_path):
+    sessions = store(tmp_path)
+    sessions.spill_path("aula-1").write_bytes(b"not a pickle")
+
+    session = sessions.get("aula-1")
+
+    assert session.history == ""
+    assert not sessions.spill_path("aula-1").exists()
@@ -0,0 +1,77 @@
+import pytest
+from app.services.intent_service import IntentService
+
+CONTEXT = {"temperature": 22.5, "light_quantity": 40.0, "humidity": 55.0,
+           "ventilador": False, "persianas": True, "bulbs": False}
+
+
+@pytest.fixture
+def intents():
+    return IntentService(enabled=True, min_confidence=0.8)
+
+
+@pytest.mark.parametrize("text, changes", [
+    ("prende la luz del pasillo", {"bulbs": True}),
+    ("apaga las luces del baño", {"bulbs": False}),
+    ("Enciende el ventilador, por favor", {"ventilador": True}),
+    ("cierra las persianas", {"persianas": False}),
+    ("enciende el ventilador y abre las persianas", {"ventilador": True, "persianas": True}),
+    ("Alexa, apaga todo", {"bulbs": False, "ventilador": False}),
+])
+def test_commands_are_matched(intents, text, changes):
+    classified = intents.classify(text)
+
+    assert classified is not None
+    assert classified[0] == changes
+    assert classified[1] >= 0.8
+
+
+@pytest.mark.parametrize("text", [
+    "¿puedes prender la luz?",
+    "qué temperatura hace en el aula",
+    "no prendas la luz",
+    "nunca apagues el ventilador",
+    "prende la luz en cinco minutos",
+    "apaga el ventilador en 10 segundos",
+    "prende la luz cuando llegue el profesor",
+    "prende la luz y apaga la luz",
+    "abre el ventilador",
+    "prende la luz de la casa de mi abuela",
+    "luces",
+    "",
+])
+def test_other_requests_go_to_the_llm(intents, text):
+    assert intents.classify(text) is None
+
+
+def test_match_answers_and_keeps_untouched_devices(intents):
+    result = intents.match(dict(CONTEXT, request="prende las luces y cierra las persianas"))
+
+    assert result == {
+        "ventilador": False,
+        "persianas": False,
+        "bulbs": True,
+        "answer": "Listo, encendiendo las luces y cerrando las persianas.",
+    }
+
+
+def test_match_reports_devices_already_in_the_requested_state(intents):
+    result = intents.match(dict(CONTEXT, request="apaga la luz"))
+
+    assert result["bulbs"] is False
+    assert result["answer"] == "Las luces ya están apagadas."
+
+
+def test_disabled_service_never_matches():
+    intents = IntentService(enabled=False, min_confidence=0.8)
+
+    assert intents.match(dict(CONTEXT, request="prende la luz")) is None
+
+
+def test_stats_count_hits_and_misses(intents):
+    intents.match(dict(CONTEXT, request="prende la luz"))
+    intents.match(dict(CONTEXT, request="qué hora es"))
+
+    stats = intents.stats(llm_seconds=2.0)
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["intents"]["bulbs:on"]["estimated_seconds_saved"] == 2.0
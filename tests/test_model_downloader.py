@@ -0,0 +1,193 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import json
+import re
+import threading
+import pytest
+from app.core import model_downloader
+from app.core.config import settings
+
+MODEL = bytes(range(256)) * 4096
+RANGE = re.compile(r"bytes=(\d+)-(\d*)$")
+
+
+class ModelServer(BaseHTTPRequestHandler):
+    files: dict = {}
+    ranges: list = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def do_GET(self):
+        self.respond(head=False)
+
+    def respond(self, head: bool):
+        data = self.files.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+
+        status, start, end = 200, 0, len(data)
+        match = RANGE.match(self.headers.get("Range", ""))
+        if match is not None:
+            self.ranges.append(self.headers["Range"])
+            start = int(match.group(1))
+            end = min(int(match.group(2)) + 1, len(data)) if match.group(2) else len(data)
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(data)}")
+        self.end_headers()
+        if not head:
+            self.wfile.write(data[start:end])
+
+
+@pytest.fixture
+def server():
+    ModelServer.files = {"/model.gguf": MODEL}
+    ModelServer.ranges = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ModelServer)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(settings, "MODEL_MIRROR_DIR", None)
+    monkeypatch.setattr(settings, "MODEL_MIRROR_URL", None)
+    monkeypatch.setattr(settings, "MODEL_DOWNLOAD_WORKERS", 4)
+
+
+def write_manifest(sha256: str = None):
+    entry = {"size": len(MODEL), "sha256": sha256 or hashlib.sha256(MODEL).hexdigest()}
+    with open(settings.MODEL_MANIFEST_PATH, "w") as f:
+        json.dump({"model.gguf": entry}, f)
+
+
+def test_fresh_download_is_verified_and_recorded(server, tmp_path):
+    output = tmp_path / "model.gguf"
+    model_downloader.download_model(f"{server}/model.gguf", output)
+
+    assert output.read_bytes() == MODEL
+    assert not (tmp_path / "model.gguf.part").exists()
+    manifest = model_downloader.load_manifest()["model.gguf"]
+    assert manifest == {"size": len(MODEL), "sha256": hashlib.sha256(MODEL).hexdigest()}
+
+
+def test_resumes_partial_download(server, tmp_path):
+    output = tmp_path / "model.gguf"
+    (tmp_path / "model.gguf.part").write_bytes(MODEL[:300_000])
+
+    model_downloader.download_model(f"{server}/model.gguf", output)
+
+    assert output.read_bytes() == MODEL
+    assert ModelServer.ranges == ["bytes=300000-"]
+
+
+def test_complete_part_file_goes_straight_to_verification(server, tmp_path):
+    output = tmp_path / "model.gguf"
+    (tmp_path / "model.gguf.part").write_bytes(MODEL)
+
+    model_downloader.download_model(f"{server}/model.gguf", output)
+
+    assert output.read_bytes() == MODEL
+    assert ModelServer.ranges == []
+
+
+def test_complete_part_file_without_known_size(server, tmp_path, monkeypatch):
+    output = tmp_path / "model.gguf"
+    (tmp_path / "model.gguf.part").write_bytes(MODEL)
+    monkeypatch.setattr(model_downloader, "probe", lambda url: model_downloader.RemoteFile(url))
+
+    model_downloader.download_model(f"{server}/model.gguf", output)
+
+    assert output.read_bytes() == MODEL
+    assert ModelServer.ranges == [f"bytes={len(MODEL)}-"]
+
+
+def test_truncated_final_file_is_resumed(server, tmp_path):
+    output = tmp_path / "model.gguf"
+    output.write_bytes(MODEL[:500_000])
+    write_manifest()
+
+    model_downloader.download_model(f"{server}/model.gguf", output)
+
+    assert output.read_bytes() == MODEL
+    assert ModelServer.ranges == ["bytes=500000-"]
+
+
+def test_oversized_final_file_is_downloaded_again(server, tmp_path):
+    output = tmp_path / "model.gguf"
+    output.write_bytes(MODEL + b"extra")
+    write_manifest()
+
+    model_downloader.download_model(f"{server}/model.gguf", output)
+
+    assert output.read_bytes() == MODEL
+
+
+def test_sha_mismatch_is_rejected(server, tmp_path):
+    output = tmp_path / "model.gguf"
+    write_manifest(sha256="0" * 64)
+
+    with pytest.raises(RuntimeError, match="SHA256 mismatch"):
+        model_downloader.download_model(f"{server}/model.gguf", output)
+
+    assert not output.exists()
+    assert not (tmp_path / "model.gguf.part").exists()
+
+
+def test_parallel_chunks_resume_from_state_file(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(model_downloader, "CHUNK_BYTES", 256 * 1024)
+    output = tmp_path / "model.gguf"
+    part = tmp_path / "model.gguf.part"
+    part.write_bytes(MODEL[:256 * 1024] + bytes(len(MODEL) - 256 * 1024))
+    (tmp_path / "model.gguf.part.json").write_text(
+        json.dumps({"size": len(MODEL), "chunk_bytes": 256 * 1024, "done": [0]}))
+
+    model_downloader.download_model(f"{server}/model.gguf", output)
+
+    assert output.read_bytes() == MODEL
+    assert sorted(ModelServer.ranges) == [
+        "bytes=262144-524287", "bytes=524288-786431", "bytes=786432-1048575"]
+    assert not (tmp_path / "model.gguf.part.json").exists()
+
+
+def test_state_file_without_part_file_downloads_everything(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(model_downloader, "CHUNK_BYTES", 256 * 1024)
+    output = tmp_path / "model.gguf"
+    (tmp_path / "model.gguf.part.json").write_text(
+        json.dumps({"size": len(MODEL), "chunk_bytes": 256 * 1024, "done": [0, 1]}))
+
+    model_downloader.download_model(f"{server}/model.gguf", output)
+
+    assert output.read_bytes() == MODEL
+    assert len(ModelServer.ranges) == 4
+
+
+def test_mirror_directory_is_used_offline(tmp_path, monkeypatch):
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    (mirror / "model.gguf").write_bytes(MODEL)
+    monkeypatch.setattr(settings, "MODEL_MIRROR_DIR", str(mirror))
+    write_manifest()
+    output = tmp_path / "models" / "model.gguf"
+
+    model_downloader.download_model("http://127.0.0.1:9/unreachable", output)
+
+    assert output.read_bytes() == MODEL
@@ -0,0 +1,111 @@
+import pytest
+from app.services import response_cache as response_cache_module
+from app.services.llm_service import ERROR_ANSWER
+from app.services.response_cache import ResponseCache
+
+BUCKETS = {"temperature": 1.0, "humidity": 5.0, "light_quantity": 10.0}
+SENSORS = {"temperature": 22.4, "light_quantity": 40.0, "humidity": 55.0,
+           "ventilador": False, "persianas": True, "bulbs": True}
+STATE = {"ventilador": False, "persianas": True, "bulbs": True}
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(enabled=True, max_entries=8, ttl=300, buckets=BUCKETS)
+
+
+def ask(request: str, session_id=None, **sensors) -> dict:
+    return {**SENSORS, **sensors, "request": request, "session_id": session_id}
+
+
+def answer(text: str) -> dict:
+    return {**STATE, "answer": text}
+
+
+def test_request_key_ignores_fillers_punctuation_and_accents():
+    assert ResponseCache.request_key("¿Qué temperatura hace en el aula?") == \
+        ResponseCache.request_key("que temperatura hace en el aula, por favor")
+
+
+def test_commands_and_empty_requests_bypass_the_cache(cache):
+    assert ResponseCache.request_key("prende la luz") is None
+    assert ResponseCache.request_key("por favor") is None
+    assert cache.get(ask("apaga el ventilador")) is None
+    assert cache.stats()["bypassed"] == 1
+
+
+def test_answer_is_served_within_the_same_sensor_bucket(cache):
+    cache.put(ask("qué temperatura hace"), answer("Hace 22 grados."))
+
+    hit = cache.get(ask("que temperatura hace?", temperature=22.9))
+
+    assert hit == answer("Hace 22 grados.")
+
+
+def test_only_fields_the_question_mentions_are_part_of_the_key(cache):
+    cache.put(ask("qué temperatura hace"), answer("Hace 22 grados."))
+
+    assert cache.get(ask("qué temperatura hace", humidity=90.0, bulbs=False)) is not None
+    assert cache.get(ask("qué temperatura hace", temperature=23.1)) is None
+
+
+def test_answer_for_a_new_bucket_invalidates_the_old_one(cache):
+    cache.put(ask("qué temperatura hace"), answer("Hace 22 grados."))
+
+    assert cache.get(ask("qué temperatura hace", temperature=23.1)) is None
+    assert cache.get(ask("qué temperatura hace")) is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_expire_after_the_ttl(cache, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(response_cache_module.time, "time", lambda: now)
+    cache.put(ask("qué temperatura hace"), answer("Hace 22 grados."))
+
+    now += 299
+    assert cache.get(ask("qué temperatura hace")) is not None
+    now += 2
+    assert cache.get(ask("qué temperatura hace")) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_answers_are_not_shared_between_sessions(cache):
+    cache.put(ask("qué temperatura hace", session_id="aula-1"), answer("Hace 22 grados."))
+
+    assert cache.get(ask("qué temperatura hace", session_id="aula-2")) is None
+    assert cache.get(ask("qué temperatura hace")) is None
+    assert cache.get(ask("qué temperatura hace", session_id="aula-1")) is not None
+
+
+def test_invalidation_stays_within_its_session(cache):
+    cache.put(ask("qué temperatura hace", session_id="aula-1"), answer("Hace 22 grados."))
+    cache.put(ask("qué temperatura hace", session_id="aula-2", temperature=25.0),
+              answer("Hace 25 grados."))
+
+    assert cache.get(ask("qué temperatura hace", session_id="aula-2", temperature=26.0)) is None
+    assert cache.get(ask("qué temperatura hace", session_id="aula-1")) == answer("Hace 22 grados.")
+
+
+def test_state_changes_and_errors_are_not_cached(cache):
+    cache.put(ask("hace calor"), {**STATE, "ventilador": True, "answer": "Enciendo el ventilador."})
+    cache.put(ask("qué temperatura hace"), answer(ERROR_ANSWER))
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_oldest_entries_are_evicted_past_the_limit(cache):
+    for index in range(10):
+        cache.put(ask(f"pregunta número {index}"), answer(f"Respuesta {index}."))
+
+    assert cache.stats()["entries"] == 8
+    assert cache.stats()["evictions"] == 2
+    assert cache.get(ask("pregunta número 0")) is None
+    assert cache.get(ask("pregunta número 9")) is not None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(enabled=False, max_entries=8, ttl=300, buckets=BUCKETS)
+    cache.put(ask("qué temperatura hace"), answer("Hace 22 grados."))
+
+    assert cache.get(ask("qué temperatura hace")) is None
@@ -0,0 +1,97 @@
+import pytest
+from app.services import sensor_history as sensor_history_module
+from app.services.sensor_history import SensorHistory
+
+NOW = 1_000_000.0
+
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    monkeypatch.setattr(sensor_history_module.time, "time", lambda: NOW)
+
+
+def reading(temperatura=None, humedad=50.0, luz=40.0, ventilador=False) -> dict:
+    return {"temperatura": temperatura, "humedad": humedad, "luz": luz,
+            "ventilador": ventilador, "persianas": True, "bulbs": True}
+
+
+def test_readings_are_downsampled_into_buckets():
+    history = SensorHistory(1000)
+    for second in range(60):
+        history.append(reading(temperatura=float(second)), NOW - 60 + second)
+
+    result = history.query(60, 6)
+
+    assert result["bucket_seconds"] == 10
+    assert result["timestamps"] == [NOW - 60 + 10 * i for i in range(6)]
+    assert result["count"] == [10] * 6
+    assert result["min"]["temperatura"] == [0.0, 10.0, 20.0, 30.0, 40.0, 50.0]
+    assert result["max"]["temperatura"] == [9.0, 19.0, 29.0, 39.0, 49.0, 59.0]
+    assert result["mean"]["temperatura"] == [4.5, 14.5, 24.5, 34.5, 44.5, 54.5]
+    assert result["mean"]["ventilador"] == [0.0] * 6
+
+
+def test_missing_values_are_left_out_of_the_aggregates():
+    history = SensorHistory(1000)
+    history.append(reading(temperatura=20.0), NOW - 50)
+    history.append(reading(temperatura=None), NOW - 45)
+    history.append(reading(temperatura=None), NOW - 5)
+
+    result = history.query(60, 2)
+
+    assert result["count"] == [2, 1]
+    assert result["mean"]["temperatura"] == [20.0, None]
+    assert result["min"]["temperatura"] == [20.0, None]
+    assert result["mean"]["humedad"] == [50.0, 50.0]
+
+
+def test_empty_buckets_and_old_readings_are_skipped():
+    history = SensorHistory(1000)
+    history.append(reading(temperatura=5.0), NOW - 500)
+    history.append(reading(temperatura=21.0), NOW - 55)
+    history.append(reading(temperatura=23.0), NOW - 1)
+
+    result = history.query(60, 6)
+
+    assert result["timestamps"] == [NOW - 60, NOW - 10]
+    assert result["count"] == [1, 1]
+    assert result["mean"]["temperatura"] == [21.0, 23.0]
+
+
+def test_reading_at_the_end_falls_in_the_last_bucket():
+    history = SensorHistory(1000)
+    history.append(reading(temperatura=22.0), NOW)
+
+    result = history.query(60, 6)
+
+    assert result["timestamps"] == [NOW - 10]
+
+
+def test_empty_history_returns_no_buckets():
+    result = SensorHistory(10).query(60, 6)
+
+    assert result["timestamps"] == [] and result["count"] == []
+
+
+def test_ring_buffer_keeps_the_latest_readings_in_order():
+    history = SensorHistory(4)
+    for second in range(10):
+        history.append(reading(temperatura=float(second)), NOW - 10 + second)
+
+    result = history.query(10, 10)
+
+    assert result["count"] == [1, 1, 1, 1]
+    assert result["mean"]["temperatura"] == [6.0, 7.0, 8.0, 9.0]
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "history.npy"
+    history = SensorHistory(100, str(path))
+    for second in range(5):
+        history.append(reading(temperatura=20.0 + second), NOW - 5 + second)
+    history.snapshot()
+
+    restored = SensorHistory(100, str(path))
+
+    assert restored.query(10, 1) == history.query(10, 1)
+    assert restored.query(10, 1)["count"] == [5]